@@ -0,0 +1,156 @@
+import numpy as np
+
+from cards import DECK_SIZE, PACKED_DECK_SIZE, RANK_OF, SUIT_OF
+
+# Decks hold the card ints from cards.py.  While resolving, each card is
+# re-coded as rank << 4 | 1 << suit so that both tests are a single bitwise
+# operation: ranks match when (a ^ b) < 16 and suits match when a & b & 15 is
+# non-zero.
+PILE_CODES = np.array([RANK_OF[card] << 4 | 1 << SUIT_OF[card] for card in range(DECK_SIZE)], dtype=np.uint8)
+
+# Three of these sit under every pile so the card "three places back" always
+# exists; rank 15 and no suit bits mean they never match anything
+PILE_FLOOR = 0xF0
+FLOOR_DEPTH = 3
+
+
+def _pack_groups():
+    """Split the permutation-rank radices 52, 51 ... 1 into runs whose product fits in a uint64"""
+    groups = []
+    start = 0
+    product = 1
+    for position in range(DECK_SIZE):
+        radix = DECK_SIZE - position
+        if product * radix >= 1 << 63:
+            groups.append((start, position, product))
+            start = position
+            product = 1
+        product *= radix
+    groups.append((start, DECK_SIZE, product))
+    return groups
+
+
+PACK_GROUPS = _pack_groups()
+
+
+def deal_batch(count, rng=None):
+    """Return a (count, 52) uint8 array of independently shuffled decks.
+
+    rng can be a numpy Generator or any seed that numpy.random.default_rng
+    accepts, such as an int or a sequence of ints.
+    """
+    rng = np.random.default_rng(rng)
+    # argsort of uniform keys gives a uniform permutation per row and works on
+    # every numpy release we support (Generator.permuted needs >= 1.20)
+    return np.argsort(rng.random((count, DECK_SIZE)), axis=1).astype(np.uint8)
+
+
+def pack_batch(decks):
+    """cards.pack_deck() for every deck in a 2-D array, returned as a list of bytes.
+
+    The Lehmer digits and the rank of each uint64-sized group of them are
+    computed for all decks at once; only the few group ranks per deck are
+    combined with Python ints.
+    """
+    decks = np.asarray(decks, dtype=np.int64)
+    count = len(decks)
+    digits = np.empty(decks.shape, dtype=np.uint64)
+    for position in range(DECK_SIZE):
+        card = decks[:, position]
+        digits[:, position] = card - (decks[:, :position] < card[:, None]).sum(axis=1)
+
+    values = [0] * count
+    for start, stop, product in PACK_GROUPS:
+        group = np.zeros(count, dtype=np.uint64)
+        for position in range(start, stop):
+            group = group * np.uint64(DECK_SIZE - position) + digits[:, position]
+        values = [value * product + part for value, part in zip(values, group.tolist())]
+    return [value.to_bytes(PACKED_DECK_SIZE, 'big') for value in values]
+
+
+def check_batch(decks, stats=None, match_counts=None):
+    """Play every deck in a 2-D array and return the cards remaining for each.
+
+    This applies exactly the same rules as simulator.check(): the newest card
+    is compared with the card three places before it, a rank match removes all
+    four cards, otherwise a suit match removes the two inner cards, and matches
+    chain until nothing more can be removed.  Instead of deleting from a list
+    and rewinding, each deck keeps a pile that cards are pushed onto, and all
+    decks advance one card at a time together.
+
+    If stats is an instrumentation.new_stats() dict, the match counts are
+    added to it.  If match_counts is a (count, 2) integer array, each deck's
+    rank and suit matches are added to its row.
+    """
+    decks = np.asarray(decks, dtype=np.uint8)
+    count, size = decks.shape
+    width = size + FLOOR_DEPTH
+
+    # Dealing order is read column by column, so lay it out that way
+    incoming = np.ascontiguousarray(PILE_CODES[decks].T)
+    pile = np.full(count * width, PILE_FLOOR, dtype=np.uint8)
+    # Flat index of the next free slot in each deck's pile
+    top = np.arange(count, dtype=np.intp) * width + FLOOR_DEPTH
+
+    for position in range(size):
+        pile[top] = incoming[position]
+        top += 1
+
+        newest = pile[top - 1]
+        fourth = pile[top - 4]
+        rank_match = (newest ^ fourth) < 16
+        suit_match = (newest & fourth & 15) != 0
+
+        # A rank match uncovers a card that was already checked, so it can
+        # never start a chain
+        top[rank_match] -= 4
+
+        # Only decks that just made a suit match can match again, so each
+        # further pass works on a shrinking set of rows
+        chained = np.flatnonzero(suit_match & ~rank_match)
+        if match_counts is not None:
+            match_counts[:, 0] += rank_match
+            match_counts[chained, 1] += 1
+        if stats is not None:
+            chain = (rank_match | suit_match).astype(np.intp)
+            stats['rank_matches'] += int(np.count_nonzero(rank_match))
+            stats['suit_matches'] += int(chained.size)
+        while chained.size:
+            heads = top[chained]
+            pile[heads - 3] = pile[heads - 1]
+            heads -= 2
+            top[chained] = heads
+
+            newest = pile[heads - 1]
+            fourth = pile[heads - 4]
+            rank_match = (newest ^ fourth) < 16
+            top[chained[rank_match]] -= 4
+            if match_counts is not None:
+                match_counts[chained[rank_match], 0] += 1
+            if stats is not None:
+                chain[chained[rank_match]] += 1
+                stats['rank_matches'] += int(np.count_nonzero(rank_match))
+            chained = chained[~rank_match & ((newest & fourth & 15) != 0)]
+            if match_counts is not None:
+                match_counts[chained, 1] += 1
+            if stats is not None:
+                chain[chained] += 1
+                stats['suit_matches'] += int(chained.size)
+
+        if stats is not None:
+            stats['longest_chain'] = max(stats['longest_chain'], int(chain.max()))
+            stats['backtrack_steps'] += int(np.maximum(chain - 1, 0).sum())
+
+    return top - (np.arange(count, dtype=np.intp) * width + FLOOR_DEPTH)
+
+
+def check_batch_matches(decks):
+    """check_batch() that also returns each deck's rank and suit match counts as a (count, 2) array"""
+    decks = np.asarray(decks, dtype=np.uint8)
+    match_counts = np.zeros((len(decks), 2), dtype=np.uint8)
+    return check_batch(decks, match_counts=match_counts), match_counts
+
+
+def histogram(remaining):
+    """Count how many decks ended with each number of cards (0-52)"""
+    return np.bincount(remaining, minlength=DECK_SIZE + 1)
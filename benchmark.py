@@ -0,0 +1,275 @@
+"""Benchmarks for the simulator and game-engine hot paths.
+
+Every workload is seeded, so two runs on the same machine time the same work.
+Results can be saved as a JSON baseline and later runs compared against it:
+
+    python benchmark.py --save bench_baseline.json
+    python benchmark.py --compare bench_baseline.json --threshold 0.15
+
+The comparison exits with status 1 when any workload's games/sec falls more
+than the threshold below the baseline.  Workloads in PER_ROUND do work that
+does not grow with the games in a round, so they report seconds per round
+instead and fail when that rises more than the threshold above the baseline.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import rng_backends
+import simulator
+from cards import DECK_SIZE, new_deck
+from game_model import GameModel
+from result_store import ResultStore
+
+try:
+    import batch_engine
+except ImportError:
+    batch_engine = None
+
+try:
+    import jit_engine
+except ImportError:
+    jit_engine = None
+
+
+def make_decks(count, seed):
+    rng = random.Random(seed)
+    deck = new_deck()
+    decks = []
+    for x in range(count):
+        rng.shuffle(deck)
+        decks.append(bytearray(deck))
+    return decks
+
+
+def bench_deal(games, seed):
+    rng = random.Random(seed)
+    full_deck = new_deck()
+
+    def run():
+        for x in range(games):
+            simulator.dealt = bytearray(full_deck)
+            simulator.deal(rng)
+    return run
+
+
+def bench_deal_counter(games, seed):
+    def run():
+        for deck in rng_backends.deal_decks('counter', games, seed):
+            pass
+    return run
+
+
+def bench_deal_batch(backend):
+    def setup(games, seed):
+        def run():
+            rng_backends.deal_batch(backend, games, seed)
+        return run
+    return setup
+
+
+def bench_check(games, seed):
+    decks = make_decks(games, seed)
+
+    def run():
+        for deck in decks:
+            simulator.dealt = deck
+            simulator.check()
+    return run
+
+
+def bench_check_by_deletion(games, seed):
+    decks = [list(deck) for deck in make_decks(games, seed)]
+
+    def run():
+        for deck in decks:
+            simulator.dealt = deck[:]
+            simulator.check_by_deletion()
+    return run
+
+
+def bench_batch_engine(games, seed):
+    decks = batch_engine.deal_batch(games, seed)
+
+    def run():
+        batch_engine.check_batch(decks)
+    return run
+
+
+def bench_jit_engine(games, seed):
+    decks = batch_engine.deal_batch(games, seed)
+    # Compiling (or loading the cached code) is not part of the timing
+    jit_engine.check_batch(decks[:1])
+
+    def run():
+        jit_engine.check_batch(decks)
+    return run
+
+
+def bench_play_round(games, seed):
+    def run():
+        simulator.play_round(0, seed, 1, games)
+    return run
+
+
+def bench_store_round(games, seed):
+    """One round's worth of results added to and exported from the result store"""
+    counts = simulator.play_round(0, seed, 1, games)
+    directory = tempfile.TemporaryDirectory()
+    store = ResultStore(os.path.join(directory.name, 'bench.db'))
+
+    def run():
+        store.add(counts)
+        store.export_text(os.path.join(directory.name, 'solitaire.txt'))
+
+    def close():
+        store.close()
+        directory.cleanup()
+    run.close = close
+    return run
+
+
+def bench_game_autoplay(games, seed):
+    """GameModel driven the way CardGame's autoplay drives it: deal, one Check, repeat"""
+    decks = make_decks(games, seed)
+    model = GameModel()
+
+    def run():
+        for deck in decks:
+            model.new_game(deck)
+            while model.autoplay_step():
+                pass
+            # CardGame.check_game_over() once the deck is empty
+            while model.can_check():
+                model.check()
+            model.is_over()
+    return run
+
+
+# name -> (setup, games per run)
+WORKLOADS = {
+    'deal': (bench_deal, 20000),
+    'deal_counter': (bench_deal_counter, 20000),
+    'check': (bench_check, 20000),
+    'check_by_deletion': (bench_check_by_deletion, 20000),
+    'play_round': (bench_play_round, 20000),
+    'store_round': (bench_store_round, 50000),
+    'game_autoplay': (bench_game_autoplay, 20000),
+}
+if batch_engine is not None:
+    WORKLOADS['batch_engine'] = (bench_batch_engine, 200000)
+    WORKLOADS['deal_batch_numpy'] = (bench_deal_batch('numpy'), 200000)
+    WORKLOADS['deal_batch_counter'] = (bench_deal_batch('counter'), 200000)
+if jit_engine is not None:
+    WORKLOADS['jit_engine'] = (bench_jit_engine, 200000)
+
+# Timed per round: a database write costs the same for any number of games
+PER_ROUND = {'store_round'}
+
+
+def measure(setup, games, seed, repeat):
+    """Return games/sec, ns per card, seconds per round and peak KiB for one workload.
+
+    A run function with a close attribute has it called once timing is done.
+    """
+    run = setup(games, seed)
+    try:
+        run()  # warm up caches and the database file
+        best = float('inf')
+        for x in range(repeat):
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+
+        # Timed separately because tracing slows everything down
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    finally:
+        if hasattr(run, 'close'):
+            run.close()
+
+    return {
+        'games_per_sec': games / best,
+        'ns_per_card': best * 1e9 / (games * DECK_SIZE),
+        'seconds_per_round': best,
+        'peak_kib': peak / 1024,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print the change against a baseline and return the names that regressed"""
+    regressed = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        if name in PER_ROUND:
+            if 'seconds_per_round' not in baseline[name]:
+                continue
+            change = result['seconds_per_round'] / baseline[name]['seconds_per_round'] - 1
+            slower = change > threshold
+            unit = 's/round'
+        else:
+            change = result['games_per_sec'] / baseline[name]['games_per_sec'] - 1
+            slower = change < -threshold
+            unit = 'games/sec'
+        flag = ''
+        if slower:
+            regressed.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<20} {change:+8.1%} {unit} vs baseline{flag}")
+    return regressed
+
+
+def workload_name(name):
+    # Not choices=: before Python 3.12, argparse checks a nargs='*' default
+    # against choices as a single value and rejects the default list
+    if name not in WORKLOADS:
+        raise argparse.ArgumentTypeError(f"unknown workload {name!r} (choose from {', '.join(sorted(WORKLOADS))})")
+    return name
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the Lazy Solitaire engines.')
+    parser.add_argument('workloads', nargs='*', type=workload_name, default=sorted(WORKLOADS),
+                        help=f"workloads to run (default: all of {', '.join(sorted(WORKLOADS))})")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per workload, the best is kept')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply every workload size')
+    parser.add_argument('--save', metavar='PATH', help='write the results to a JSON baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare against a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='allowed fractional drop in games/sec (or rise in s/round) before failing '
+                             '(default: 0.10)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    results = {}
+    print(f"{'workload':<20} {'games/sec':>14} {'ns/card':>10} {'peak KiB':>10}")
+    for name in args.workloads:
+        setup, games = WORKLOADS[name]
+        result = measure(setup, max(1, int(games * args.scale)), args.seed, args.repeat)
+        results[name] = result
+        if name in PER_ROUND:
+            print(f"{name:<20} {result['seconds_per_round']:>14.4f} {'s/round':>10} "
+                  f"{result['peak_kib']:>10.1f}")
+        else:
+            print(f"{name:<20} {result['games_per_sec']:>14,.0f} {result['ns_per_card']:>10.1f} "
+                  f"{result['peak_kib']:>10.1f}")
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.threshold):
+            raise SystemExit(1)
@@ -0,0 +1,73 @@
+from array import array
+
+# A card is a small int: rank * 4 + suit, so 0-51 for a full deck.  Ranks are
+# ace low (0 = ace ... 12 = king) and suits follow SUIT_NAMES.  Decks are kept
+# in array('B') / bytearray buffers, one byte per card.
+DECK_SIZE = 52
+
+RANK_NAMES = ('a', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'j', 'q', 'k')
+SUIT_NAMES = ('h', 'd', 'c', 's')
+
+# Long names used by the image files in resources/cards/pngfree
+RANK_FILE_NAMES = ('ace', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'jack', 'queen', 'king')
+SUIT_FILE_NAMES = ('hearts', 'diamonds', 'clubs', 'spades')
+
+# Flat lookup tables so hot loops compare RANK_OF[a] == RANK_OF[b] without
+# creating any objects
+RANK_OF = bytes(card >> 2 for card in range(DECK_SIZE))
+SUIT_OF = bytes(card & 3 for card in range(DECK_SIZE))
+
+
+def make_card(rank, suit):
+    return rank << 2 | suit
+
+
+def new_deck():
+    """Return an unshuffled deck as an array('B')"""
+    return array('B', range(DECK_SIZE))
+
+
+def card_name(card):
+    """Short name such as '10_of_h'"""
+    return f"{RANK_NAMES[RANK_OF[card]]}_of_{SUIT_NAMES[SUIT_OF[card]]}"
+
+
+def card_from_name(name):
+    rank, suit = name.split('_of_')
+    return make_card(RANK_NAMES.index(rank), SUIT_NAMES.index(suit))
+
+
+def card_filename(card):
+    """Image file name such as '10_of_hearts.png'"""
+    return f"{RANK_FILE_NAMES[RANK_OF[card]]}_of_{SUIT_FILE_NAMES[SUIT_OF[card]]}.png"
+
+
+def card_from_filename(filename):
+    rank, suit = filename.rsplit('.', 1)[0].split('_of_')
+    return make_card(RANK_FILE_NAMES.index(rank), SUIT_FILE_NAMES.index(suit))
+
+
+# A full deck is one of 52! orderings, which fits in 226 bits
+PACKED_DECK_SIZE = 29
+
+
+def pack_deck(deck):
+    """Encode a full deck in dealing order as its 29-byte permutation rank"""
+    used = 0
+    value = 0
+    for i, card in enumerate(deck):
+        # Lehmer digit: how many unused cards are smaller than this one
+        value = value * (DECK_SIZE - i) + card - (used & ((1 << card) - 1)).bit_count()
+        used |= 1 << card
+    return value.to_bytes(PACKED_DECK_SIZE, 'big')
+
+
+def unpack_deck(data):
+    """Decode pack_deck() output back into an array('B') in dealing order"""
+    value = int.from_bytes(data, 'big')
+    digits = []
+    for radix in range(1, DECK_SIZE + 1):
+        value, digit = divmod(value, radix)
+        digits.append(digit)
+    unused = list(range(DECK_SIZE))
+    return array('B', (unused.pop(digit) for digit in reversed(digits)))
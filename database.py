@@ -1,10 +1,29 @@
 import sqlite3
+import queue
+import threading
+from concurrent.futures import Future
 from datetime import datetime
 import os
+from time import monotonic
 from kivy.utils import platform
 
+# Results waiting for the writer thread; save_game_result blocks when full
+WRITE_QUEUE_SIZE = 256
+# Most results committed in one transaction
+WRITE_BATCH_SIZE = 64
+# Bumped whenever create_tables gains a migration
+SCHEMA_VERSION = 1
+# Longest flush() and close() wait for the writer thread, in seconds
+FLUSH_TIMEOUT = 5
+# Set to 1 to print the database debug log
+DEBUG_ENV = 'SOLITAIRE_DB_DEBUG'
+
+
 class GameDatabase:
-    def __init__(self):
+    def __init__(self, debug=None):
+        if debug is None:
+            debug = os.environ.get(DEBUG_ENV, '') not in ('', '0')
+        self.debug = debug
         # Get the appropriate storage path
         if platform == 'android':
             from android.storage import app_storage_path
@@ -13,12 +32,26 @@ class GameDatabase:
         else:
             db_path = 'game_stats.db'  # Fallback for non-Android platforms
         
-        print(f"Database path: {db_path}")  # Debug print
+        self.log(f"Database path: {db_path}")
+        self.db_path = db_path
         self.conn = sqlite3.connect(db_path)
+        # WAL lets the UI connection read while the writer thread commits
+        self.conn.execute('PRAGMA journal_mode=WAL')
         self.create_tables()
 
+        # Inserts are written behind by a thread with its own connection; the
+        # error it failed with, if it could not open one
+        self.writer_error = None
+        self.write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self.writer = threading.Thread(target=self._write_behind, name='game-db-writer', daemon=True)
+        self.writer.start()
+
+    def log(self, message):
+        if self.debug:
+            print(message)
+
     def create_tables(self):
-        print("\n=== Creating Tables Debug ===")
+        self.log("\n=== Creating Tables Debug ===")
         cursor = self.conn.cursor()
         try:
             # Only create the table if it doesn't exist
@@ -32,61 +65,189 @@ class GameDatabase:
             )
             ''')
             self.conn.commit()
-            print("Table verified/created successfully")
+            self.log("Table verified/created successfully")
+
+            cursor.execute('PRAGMA user_version')
+            if cursor.fetchone()[0] < 1:
+                self.add_stats_summary()
             
-            # Check table schema
-            cursor.execute("PRAGMA table_info(game_results)")
-            columns = cursor.fetchall()
-            print("Table schema:", columns)
+            if self.debug:
+                # Check table schema
+                cursor.execute("PRAGMA table_info(game_results)")
+                columns = cursor.fetchall()
+                self.log(f"Table schema: {columns}")
         except Exception as e:
             print(f"Error creating table: {e}")
             raise e
 
-    def save_game_result(self, is_autoplay, cards_remaining, duration_seconds, status):
-        print("\n=== Database Save Debug ===")
-        print(f"Saving: autoplay={is_autoplay}, cards={cards_remaining}, duration={duration_seconds}, status={status}")
-        
-        cursor = self.conn.cursor()
+    def add_stats_summary(self):
+        """Migration 1: running totals per mode so get_stats does not scan every game"""
+        self.log("Migrating: adding game_stats_summary")
+        with self.conn:
+            self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS game_stats_summary (
+                is_autoplay BOOLEAN PRIMARY KEY,
+                games_played INTEGER,
+                cards_remaining_total INTEGER,
+                best_result INTEGER,
+                wins INTEGER
+            )
+            ''')
+            # Kept up to date in the same transaction as every insert
+            self.conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS game_results_summary AFTER INSERT ON game_results
+            BEGIN
+                INSERT INTO game_stats_summary
+                (is_autoplay, games_played, cards_remaining_total, best_result, wins)
+                VALUES (NEW.is_autoplay, 1, NEW.cards_remaining, NEW.cards_remaining, NEW.status = 'won')
+                ON CONFLICT(is_autoplay) DO UPDATE SET
+                    games_played = games_played + 1,
+                    cards_remaining_total = cards_remaining_total + excluded.cards_remaining_total,
+                    best_result = MIN(best_result, excluded.best_result),
+                    wins = wins + excluded.wins;
+            END
+            ''')
+            self.conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_game_results_mode ON game_results (is_autoplay, cards_remaining)'
+            )
+            # Backfill once from the games saved before the summary existed
+            self.conn.execute('DELETE FROM game_stats_summary')
+            self.conn.execute('''
+            INSERT INTO game_stats_summary
+            (is_autoplay, games_played, cards_remaining_total, best_result, wins)
+            SELECT
+                is_autoplay,
+                COUNT(*),
+                SUM(cards_remaining),
+                MIN(cards_remaining),
+                SUM(CASE WHEN status = 'won' THEN 1 ELSE 0 END)
+            FROM game_results
+            GROUP BY is_autoplay
+            ''')
+            self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def save_game_result(self, is_autoplay, cards_remaining, duration_seconds, status, callback=None):
+        """Queue a result for the writer thread and return a Future.
+
+        The Future resolves to None once the row is committed, or to the
+        database error.  callback, if given, is called with the Future when
+        it is done (on the writer thread).
+        """
+        self.log("\n=== Database Save Debug ===")
+        self.log(f"Saving: autoplay={is_autoplay}, cards={cards_remaining}, duration={duration_seconds}, status={status}")
+
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+        if self.writer_error is not None:
+            future.set_exception(self.writer_error)
+            return future
+        self.write_queue.put(((is_autoplay, cards_remaining, duration_seconds, status), future))
+        return future
+
+    def _write_behind(self):
         try:
-            cursor.execute('''
-            INSERT INTO game_results 
-            (is_autoplay, cards_remaining, duration_seconds, status)
-            VALUES (?, ?, ?, ?)
-            ''', (is_autoplay, cards_remaining, duration_seconds, status))
-            self.conn.commit()
-            print("Database insert successful")
-            
-            # Verify the save
-            cursor.execute('SELECT * FROM game_results ORDER BY id DESC LIMIT 1')
-            last_record = cursor.fetchone()
-            print(f"Last record in database: {last_record}")
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('PRAGMA journal_mode=WAL')
         except Exception as e:
             print(f"Database error: {e}")
-            raise e
+            self.writer_error = e
+            self._fail_queued(e)
+            return
+        while True:
+            batch = [self.write_queue.get()]
+            # Commit everything that is already waiting in one transaction
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self.write_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            rows = [item for item in batch if item is not None]
+            try:
+                with conn:
+                    conn.executemany('''
+                    INSERT INTO game_results 
+                    (is_autoplay, cards_remaining, duration_seconds, status)
+                    VALUES (?, ?, ?, ?)
+                    ''', [values for values, future in rows])
+                if rows:
+                    self.log(f"Database insert successful ({len(rows)} rows)")
+                for values, future in rows:
+                    future.set_result(None)
+            except Exception as e:
+                print(f"Database error: {e}")
+                for values, future in rows:
+                    future.set_exception(e)
+
+            for item in batch:
+                self.write_queue.task_done()
+            if stop:
+                conn.close()
+                return
+
+    def _fail_queued(self, error):
+        """Fail every result queued now or later with error, until close()"""
+        while True:
+            item = self.write_queue.get()
+            if item is not None:
+                item[1].set_exception(error)
+            self.write_queue.task_done()
+            if item is None:
+                return
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """Wait up to timeout seconds for every queued result to be written.
+
+        Returns False if some were still queued when the time ran out.
+        """
+        deadline = monotonic() + timeout
+        # Queue.join() with a timeout
+        with self.write_queue.all_tasks_done:
+            while self.write_queue.unfinished_tasks:
+                remaining = deadline - monotonic()
+                if remaining <= 0 or not self.writer.is_alive():
+                    print("Database writer did not finish in time")
+                    return False
+                self.write_queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self):
+        """Commit the queued results and stop the writer thread"""
+        if self.writer.is_alive():
+            try:
+                self.write_queue.put(None, timeout=FLUSH_TIMEOUT)
+            except queue.Full:
+                print("Database writer did not finish in time")
+            self.writer.join(FLUSH_TIMEOUT)
+        self.conn.close()
 
     def get_stats(self):
-        print("\n=== Getting Stats Debug ===")
+        self.log("\n=== Getting Stats Debug ===")
+        # Include results that are still waiting to be written
+        self.flush()
         cursor = self.conn.cursor()
         
-        # First, let's see what's in the table
-        cursor.execute('SELECT * FROM game_results')
-        all_records = cursor.fetchall()
-        print(f"Total records in database: {len(all_records)}")
-        print("All records:", all_records)
-        
+        if self.debug:
+            # First, let's see the latest games
+            cursor.execute('SELECT * FROM game_results ORDER BY id DESC LIMIT 20')
+            self.log(f"Latest records: {cursor.fetchall()}")
+
         try:
+            # Running totals kept by the game_results_summary trigger
             cursor.execute('''
-            SELECT 
+            SELECT
                 is_autoplay,
-                COUNT(*) as games_played,
-                AVG(CAST(cards_remaining AS FLOAT)) as avg_cards_remaining,
-                MIN(cards_remaining) as best_result,
-                SUM(CASE WHEN status = 'won' THEN 1 ELSE 0 END) as wins
-            FROM game_results
-            GROUP BY is_autoplay
+                games_played,
+                CAST(cards_remaining_total AS FLOAT) / games_played as avg_cards_remaining,
+                best_result,
+                wins
+            FROM game_stats_summary
+            ORDER BY is_autoplay
             ''')
             results = cursor.fetchall()
-            print("Stats query results:", results)
+            self.log(f"Stats query results: {results}")
             return results
         except Exception as e:
             print(f"Error getting stats: {e}")
@@ -0,0 +1,119 @@
+"""Archive of individual simulated deals and how they ended.
+
+simulator.py --archive deals.db stores every deal it plays as a 29-byte
+packed permutation (cards.pack_deck) with its cards remaining and match
+counts.  Deals are indexed by result, so finding every winning deal does not
+scan the rest:
+
+    python deal_archive.py deals.db --remaining 0 --limit 10
+
+Any stored deal can be played again in the graphical game:
+
+    python main.py -- --archive deals.db --deal 12345
+"""
+import argparse
+import sqlite3
+
+from cards import card_name, unpack_deck
+
+
+class DealArchive:
+    """Bulk-inserted table of deals; one transaction per simulator round.
+
+    Rounds of a campaign are recorded in archived_rounds in the same
+    transaction as their deals, so a round replayed after a resume is not
+    archived twice.
+    """
+
+    def __init__(self, path='deals.db'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.create_tables()
+
+    def create_tables(self):
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS deals (
+                    id INTEGER PRIMARY KEY,
+                    deck BLOB NOT NULL,
+                    remaining INTEGER NOT NULL,
+                    rank_matches INTEGER NOT NULL,
+                    suit_matches INTEGER NOT NULL
+                )
+            ''')
+            # The rowid is part of every index entry, so this also keeps each
+            # result's deals in the order they were played
+            self.conn.execute('CREATE INDEX IF NOT EXISTS deals_by_remaining ON deals (remaining)')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS archived_rounds (
+                    campaign TEXT,
+                    round INTEGER,
+                    PRIMARY KEY (campaign, round)
+                )
+            ''')
+
+    def add(self, rows, campaign=None, round_number=None):
+        """Insert (packed deck, remaining, rank matches, suit matches) rows in one transaction.
+
+        Returns False without inserting anything if this campaign round is
+        already archived.
+        """
+        with self.conn:
+            if campaign is not None:
+                cursor = self.conn.execute(
+                    'INSERT OR IGNORE INTO archived_rounds (campaign, round) VALUES (?, ?)',
+                    (campaign, round_number)
+                )
+                if cursor.rowcount != 1:
+                    return False
+            self.conn.executemany(
+                'INSERT INTO deals (deck, remaining, rank_matches, suit_matches) VALUES (?, ?, ?, ?)',
+                rows
+            )
+        return True
+
+    def deck(self, deal_id):
+        """Return a stored deal as an array('B') in dealing order, or None"""
+        row = self.conn.execute('SELECT deck FROM deals WHERE id = ?', (deal_id,)).fetchone()
+        if row is None:
+            return None
+        return unpack_deck(row[0])
+
+    def deals(self, remaining=None, limit=None):
+        """Yield (id, deck, remaining, rank matches, suit matches), optionally for one result"""
+        query = 'SELECT id, deck, remaining, rank_matches, suit_matches FROM deals'
+        params = []
+        if remaining is not None:
+            query += ' WHERE remaining = ?'
+            params.append(remaining)
+        query += ' ORDER BY id'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        for deal_id, deck, cards_remaining, rank_matches, suit_matches in self.conn.execute(query, params):
+            yield deal_id, unpack_deck(deck), cards_remaining, rank_matches, suit_matches
+
+    def count(self, remaining=None):
+        if remaining is None:
+            return self.conn.execute('SELECT COUNT(*) FROM deals').fetchone()[0]
+        return self.conn.execute('SELECT COUNT(*) FROM deals WHERE remaining = ?', (remaining,)).fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='List deals stored by simulator.py --archive.')
+    parser.add_argument('path', nargs='?', default='deals.db')
+    parser.add_argument('--remaining', type=int, default=None, help='only deals that ended with this many cards')
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    archive = DealArchive(args.path)
+    print(f"{archive.count(args.remaining)} deals")
+    for deal_id, deck, remaining, rank_matches, suit_matches in archive.deals(args.remaining, args.limit):
+        print(f"{deal_id} remaining={remaining} rank={rank_matches} suit={suit_matches}: "
+              + ' '.join(card_name(card) for card in deck))
+    archive.close()
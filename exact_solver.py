@@ -0,0 +1,152 @@
+"""Exact cards-remaining distribution for reduced decks.
+
+A reduced deck has R ranks and S suits (R * S cards).  Instead of sampling
+deals, the solver walks every deal as a tree: each node is the resolved pile
+plus the set of cards not dealt yet, and the next card can be any of those.
+Nodes that are the same up to renaming ranks and suits share one entry in a
+transposition table, so each distinct situation is solved once.
+
+Counts are exact numbers of deals out of (R * S)!, in the same 0..N shape as
+the simulator's solitare table:
+
+    python exact_solver.py --ranks 4 --suits 3
+"""
+import argparse
+from collections import OrderedDict
+from fractions import Fraction
+from math import factorial
+
+from cards import RANK_OF, SUIT_OF, make_card
+from resolver import Resolver
+
+
+class TranspositionTable:
+    """Memo of solved nodes that evicts the least recently used beyond max_entries"""
+
+    def __init__(self, max_entries=2000000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        counts = self.entries.get(key)
+        if counts is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return counts
+
+    def put(self, key, counts):
+        self.entries[key] = counts
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class ExactSolver:
+    """Counts how many deals of an R x S deck end with each number of cards"""
+
+    def __init__(self, ranks, suits, max_entries=2000000):
+        if not 1 <= suits <= 4 or not 1 <= ranks <= 13:
+            raise ValueError("A reduced deck has 1-13 ranks and 1-4 suits")
+        self.ranks = ranks
+        self.suits = suits
+        self.size = ranks * suits
+        self.cards = [make_card(rank, suit) for rank in range(ranks) for suit in range(suits)]
+        self.resolver = Resolver(size=self.size)
+        self.table = TranspositionTable(max_entries)
+
+    def solve(self):
+        """Return a list where entry n is the number of deals ending with n cards"""
+        remaining = 0
+        for card in self.cards:
+            remaining |= 1 << card
+        return list(self._count(b'', remaining, self.size))
+
+    def _count(self, pile, remaining, left):
+        if not left:
+            counts = [0] * (self.size + 1)
+            counts[len(pile)] = 1
+            return counts
+
+        key = self._canonical(pile, remaining)
+        counts = self.table.get(key)
+        if counts is not None:
+            return counts
+
+        counts = [0] * (self.size + 1)
+        resolver = self.resolver
+        mask = remaining
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            resolver.pile[:len(pile)] = pile
+            resolver.height = len(pile)
+            resolver.deal(bit.bit_length() - 1)
+            child = self._count(bytes(resolver.pile[:resolver.height]), remaining ^ bit, left - 1)
+            for result, count in enumerate(child):
+                counts[result] += count
+
+        self.table.put(key, counts)
+        return counts
+
+    def _canonical(self, pile, remaining):
+        """Rename ranks and suits so that equivalent nodes get the same key.
+
+        Labels are numbered in order of first appearance in the pile; labels
+        not on the pile are ordered by what is left of them in the deck.  Any
+        consistent renaming gives an equivalent node, so ties only cost
+        missed table hits, never wrong counts.
+        """
+        left = [card for card in self.cards if remaining >> card & 1]
+        rank_map = {}
+        suit_map = {}
+        for card in pile:
+            rank_map.setdefault(RANK_OF[card], len(rank_map))
+            suit_map.setdefault(SUIT_OF[card], len(suit_map))
+
+        if len(suit_map) < self.suits:
+            unseen = [suit for suit in range(self.suits) if suit not in suit_map]
+            unseen.sort(key=lambda suit: (-sum(SUIT_OF[card] == suit for card in left), suit))
+            for suit in unseen:
+                suit_map[suit] = len(suit_map)
+        if len(rank_map) < self.ranks:
+            unseen = [rank for rank in range(self.ranks) if rank not in rank_map]
+            unseen.sort(key=lambda rank: (
+                sorted(suit_map[SUIT_OF[card]] for card in left if RANK_OF[card] == rank), rank))
+            for rank in unseen:
+                rank_map[rank] = len(rank_map)
+
+        new_pile = bytes(make_card(rank_map[RANK_OF[card]], suit_map[SUIT_OF[card]]) for card in pile)
+        new_remaining = 0
+        for card in left:
+            new_remaining |= 1 << make_card(rank_map[RANK_OF[card]], suit_map[SUIT_OF[card]])
+        return new_pile, new_remaining
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Exact outcome distribution for a reduced deck.')
+    parser.add_argument('--ranks', type=int, default=4)
+    parser.add_argument('--suits', type=int, default=3)
+    parser.add_argument('--table-size', type=int, default=2000000,
+                        help='most nodes kept in the transposition table (default: 2000000)')
+    parser.add_argument('--export', metavar='PATH', default=None,
+                        help="write 'remaining count' lines like solitaire.txt")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    solver = ExactSolver(args.ranks, args.suits, args.table_size)
+    counts = solver.solve()
+    deals = factorial(solver.size)
+    for remaining_cards, count in enumerate(counts):
+        probability = Fraction(count, deals)
+        print(f"{remaining_cards} {count} {float(probability):.12f}")
+    print(f"{deals} deals, {solver.table.misses} nodes solved, {solver.table.hits} table hits")
+
+    if args.export:
+        with open(args.export, 'w') as file:
+            for remaining_cards, count in enumerate(counts):
+                file.write(f"{remaining_cards} {count}\n")
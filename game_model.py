@@ -0,0 +1,137 @@
+"""Lazy Solitaire game state and rules with no Kivy dependency.
+
+CardGame in main.py observes a GameModel and only renders it.  The model can
+also be driven on its own, e.g. to batch-play Computer games in CI:
+
+    python game_model.py --games 10000 --seed 1
+"""
+import random
+from array import array
+from collections import Counter
+
+from cards import DECK_SIZE, new_deck
+from resolver import Resolver
+
+
+class GameModel:
+    """One game: the deck, the dealt pile and the cards still in play.
+
+    Listeners registered with bind() are called as listener(model, event)
+    after every change, where event is 'new_game', 'deal', 'check' or
+    'game_over'.
+    """
+
+    def __init__(self, rng=random):
+        self.rng = rng
+        self.resolver = Resolver()
+        self.listeners = []
+        self.new_game()
+
+    def bind(self, listener):
+        self.listeners.append(listener)
+
+    def notify(self, event):
+        for listener in self.listeners:
+            listener(self, event)
+
+    @property
+    def cards_in_deck(self):
+        return len(self.deck)
+
+    @property
+    def total_cards(self):
+        """Cards still in play, in the deck or on the pile"""
+        return len(self.deck) + len(self.resolver)
+
+    def dealt_cards(self):
+        """The dealt pile as a list, bottom card first"""
+        return self.resolver.cards()
+
+    def new_game(self, deck=None):
+        """Start a game with a fresh shuffle, or with the given deck in dealing order"""
+        if deck is None:
+            self.deck = new_deck()
+            self.rng.shuffle(self.deck)
+        else:
+            # deal() takes cards from the end
+            self.deck = array('B', reversed(deck))
+        self.resolver.reset()
+        self.finished = False
+        self.notify('new_game')
+
+    def deal(self):
+        """Move the top card of the deck onto the pile and return it"""
+        card = self.deck.pop()
+        self.resolver.add(card)
+        self.notify('deal')
+        return card
+
+    def check(self):
+        """Make one match on top of the pile and return it, or None"""
+        match = self.resolver.step()
+        self.notify('check')
+        return match
+
+    def can_check(self):
+        """True if Check would remove cards right now"""
+        return self.resolver.find_match() is not None
+
+    def is_over(self):
+        """True when the deck is empty and no card on the pile can match the top card"""
+        return not self.deck and not self.can_check() and not self.resolver.top_matches_any()
+
+    def finish(self):
+        """Make every match left on top of the pile and end the game.
+
+        CardGame calls this for every game that ends, as the original app's
+        check_game_over() resolved the top of the pile before game_over().
+        """
+        while self.resolver.step() is not None:
+            pass
+        self.finished = True
+        self.notify('game_over')
+        return self.total_cards
+
+    def autoplay_step(self):
+        """One Computer move: deal and check once.  False when the deck is empty"""
+        if not self.deck:
+            return False
+        self.deal()
+        self.check()
+        return True
+
+    def play_autoplay(self):
+        """Play the rest of this game as the Computer and return the cards remaining.
+
+        This is the turbo mode: it runs in a tight loop and listeners only
+        hear about the final state.
+        """
+        resolver = self.resolver
+        while self.deck:
+            resolver.add(self.deck.pop())
+            resolver.step()
+        return self.finish()
+
+
+def play_games(count, rng=random):
+    """Play count Computer games and return a Counter of cards remaining"""
+    model = GameModel(rng)
+    results = Counter()
+    for x in range(count):
+        model.new_game()
+        results[model.play_autoplay()] += 1
+    return results
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Play Computer games of Lazy Solitaire without a display.')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    results = play_games(args.games, random.Random(args.seed))
+    for remaining_cards in range(DECK_SIZE + 1):
+        if results[remaining_cards]:
+            print(f"{remaining_cards} {results[remaining_cards]}")
+    print(f"Won {results[0]} of {args.games} games.")
@@ -0,0 +1,49 @@
+import csv
+import json
+import os
+
+STAT_FIELDS = ('games', 'rank_matches', 'suit_matches', 'backtrack_steps', 'longest_chain',
+               'shuffle_seconds', 'resolve_seconds')
+ROUND_FIELDS = ('campaign', 'round', 'persist_seconds', 'wall_seconds') + STAT_FIELDS
+
+
+def new_stats():
+    """Empty per-round counters.
+
+    backtrack_steps counts the matches made without dealing a new card, i.e.
+    every match after the first in a chain; longest_chain is the most matches
+    made in a row after a single card was dealt.
+    """
+    return {field: 0 for field in STAT_FIELDS}
+
+
+def merge_stats(total, part):
+    for field in STAT_FIELDS:
+        if field == 'longest_chain':
+            total[field] = max(total[field], part[field])
+        else:
+            total[field] += part[field]
+
+
+class StatsWriter:
+    """Appends one record per round to a JSON-lines file, or to a CSV file if path ends in .csv"""
+
+    def __init__(self, path):
+        self.path = path
+        self.is_csv = path.endswith('.csv')
+        write_header = self.is_csv and not os.path.exists(path)
+        self.file = open(path, 'a', newline='')
+        if self.is_csv:
+            self.writer = csv.DictWriter(self.file, fieldnames=ROUND_FIELDS)
+            if write_header:
+                self.writer.writeheader()
+
+    def write(self, record):
+        if self.is_csv:
+            self.writer.writerow({field: record.get(field) for field in ROUND_FIELDS})
+        else:
+            self.file.write(json.dumps({field: record.get(field) for field in ROUND_FIELDS}) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
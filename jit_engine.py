@@ -0,0 +1,129 @@
+"""Numba-compiled version of batch_engine.check_batch().
+
+Each deck is resolved with the same loop as Resolver.play(), compiled to
+machine code, instead of advancing every deck one numpy operation at a
+time.  Compiled code is cached in __pycache__ (or NUMBA_CACHE_DIR), so only
+the first run after a change pays for compiling.
+
+Importing this module plays a fixed set of decks with both this kernel and
+Resolver and raises SelfTestError, an ImportError, if they disagree or the
+kernel fails to compile or run, so callers that treat it as optional fall
+back to the other engines.
+"""
+import random
+
+import numpy as np
+from numba import njit
+
+from cards import DECK_SIZE, RANK_OF, SUIT_OF, new_deck
+from instrumentation import new_stats
+from resolver import Resolver
+
+RANKS = np.frombuffer(RANK_OF, dtype=np.uint8)
+SUITS = np.frombuffer(SUIT_OF, dtype=np.uint8)
+
+# Columns of the per-deck counts the kernel returns
+RANK_MATCHES, SUIT_MATCHES, BACKTRACK_STEPS, LONGEST_CHAIN = range(4)
+
+SELF_TEST_DECKS = 500
+
+
+class SelfTestError(ImportError):
+    pass
+
+
+@njit(cache=True, nogil=True)
+def _play_decks(decks, ranks, suits, remaining, counts):
+    pile = np.empty(decks.shape[1], dtype=np.uint8)
+    for deck in range(decks.shape[0]):
+        height = 0
+        rank_matches = suit_matches = backtrack_steps = longest_chain = 0
+        for position in range(decks.shape[1]):
+            card = decks[deck, position]
+            pile[height] = card
+            height += 1
+            chain = 0
+            while height >= 4:
+                fourth = pile[height - 4]
+                if ranks[card] == ranks[fourth]:
+                    # The card uncovered was already checked, so no chain
+                    height -= 4
+                    rank_matches += 1
+                    chain += 1
+                    break
+                elif suits[card] == suits[fourth]:
+                    pile[height - 3] = card
+                    height -= 2
+                    suit_matches += 1
+                    chain += 1
+                else:
+                    break
+            if chain:
+                backtrack_steps += chain - 1
+                longest_chain = max(longest_chain, chain)
+        remaining[deck] = height
+        counts[deck, RANK_MATCHES] = rank_matches
+        counts[deck, SUIT_MATCHES] = suit_matches
+        counts[deck, BACKTRACK_STEPS] = backtrack_steps
+        counts[deck, LONGEST_CHAIN] = longest_chain
+
+
+def play_decks(decks):
+    """Return (cards remaining, (count, 4) match counts) for every deck in a 2-D array"""
+    decks = np.ascontiguousarray(decks, dtype=np.uint8)
+    remaining = np.empty(len(decks), dtype=np.intp)
+    counts = np.empty((len(decks), 4), dtype=np.int32)
+    _play_decks(decks, RANKS, SUITS, remaining, counts)
+    return remaining, counts
+
+
+def check_batch(decks, stats=None, match_counts=None):
+    """batch_engine.check_batch() with the same results, arguments and stats"""
+    remaining, counts = play_decks(decks)
+    if match_counts is not None:
+        match_counts[:, 0] += counts[:, RANK_MATCHES].astype(match_counts.dtype)
+        match_counts[:, 1] += counts[:, SUIT_MATCHES].astype(match_counts.dtype)
+    if stats is not None:
+        stats['rank_matches'] += int(counts[:, RANK_MATCHES].sum())
+        stats['suit_matches'] += int(counts[:, SUIT_MATCHES].sum())
+        stats['backtrack_steps'] += int(counts[:, BACKTRACK_STEPS].sum())
+        if len(counts):
+            stats['longest_chain'] = max(stats['longest_chain'], int(counts[:, LONGEST_CHAIN].max()))
+    return remaining
+
+
+def check_batch_matches(decks):
+    """check_batch() that also returns each deck's rank and suit match counts as a (count, 2) array"""
+    remaining, counts = play_decks(decks)
+    return remaining, counts[:, [RANK_MATCHES, SUIT_MATCHES]].astype(np.uint8)
+
+
+def self_test(count=SELF_TEST_DECKS, seed=0):
+    """Raise SelfTestError unless the kernel and Resolver.play_counted() agree on count fixed decks"""
+    rng = random.Random(seed)
+    deck = new_deck()
+    # The unshuffled deck never matches a rank, so it covers long suit chains
+    decks = [deck[:]]
+    for x in range(count - 1):
+        rng.shuffle(deck)
+        decks.append(deck[:])
+    remaining, counts = play_decks(np.array(decks, dtype=np.uint8).reshape(count, DECK_SIZE))
+
+    resolver = Resolver()
+    for index, deck in enumerate(decks):
+        stats = new_stats()
+        expected = (resolver.play_counted(deck, stats), stats['rank_matches'], stats['suit_matches'],
+                    stats['backtrack_steps'], stats['longest_chain'])
+        got = (int(remaining[index]),) + tuple(int(n) for n in counts[index])
+        if got != expected:
+            raise SelfTestError(f"jit_engine disagrees with Resolver on self-test deck {index}: "
+                                f"{got} != {expected}")
+
+
+try:
+    # The first call compiles the kernel, so numba's typing errors show up here
+    self_test()
+except SelfTestError:
+    raise
+except Exception as e:
+    raise SelfTestError(f"jit_engine could not compile or run its kernel: {e!r}") from e
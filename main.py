@@ -1,28 +1,100 @@
+import startup_timing  # first, so the import phase covers everything below
+
 from kivy.app import App
 from kivy.uix.widget import Widget
 from kivy.uix.button import Button
 from kivy.uix.image import Image
-from kivy.core.window import Window
 from kivy.clock import Clock
 from kivy.graphics import Rectangle, Color
 from kivy.properties import ListProperty, NumericProperty, BooleanProperty
 from kivy.core.image import Image as CoreImage
 from kivy.uix.label import Label
-from kivy.uix.popup import Popup
-import random
 import os
-from database import GameDatabase
-from time import time
+from cards import DECK_SIZE, card_filename
+from game_model import GameModel
+from resolver import RANK_MATCH, SUIT_MATCH
+from time import perf_counter, time
+
+__version__ = '1.0.3'
+
+startup_timing.version = __version__
+startup_timing.mark('import')
+# Importing the window creates it
+from kivy.core.window import Window
+startup_timing.mark('window')
+
+# Decoded card textures shared by every Card widget, keyed by image path
+_textures = {}
+
+
+def get_texture(source):
+    """Return the texture for an image file, decoding it only the first time"""
+    texture = _textures.get(source)
+    if texture is None:
+        texture = CoreImage(source, keep_data=True).texture
+        _textures[source] = texture
+    return texture
+
+
+# Outcome tables shipped in resources, mapped on first use; False if the app
+# was built without one
+_outcome_tables = {}
+
+
+def ranking_text(remaining, computer=False):
+    """'better than N% of ...' for a result, or '' without the outcome table.
+
+    Human results are ranked against simulated deals where every match is
+    made as soon as it appears; Computer results against simulated Computer
+    games, which press Check once per card and win about four times less often.
+    """
+    table = _outcome_tables.get(computer)
+    if table is None:
+        from outcome_table import COMPUTER_TABLE_PATH, TABLE_PATH, OutcomeTable
+        try:
+            table = OutcomeTable(COMPUTER_TABLE_PATH if computer else TABLE_PATH)
+        except (OSError, ValueError) as e:
+            print(f"No outcome table: {e}")
+            table = False
+        _outcome_tables[computer] = table
+    if not table:
+        return ''
+    played = 'Computer games' if computer else 'deals with every match made at once'
+    return f"better than {table.better_than(remaining):.0%} of simulated {played}"
+
 
 class Card(Image):
-    def __init__(self, source, pos, size=(100, 140), **kwargs):
+    def __init__(self, source=None, pos=(0, 0), size=(100, 140), **kwargs):
         super().__init__(**kwargs)
-        self.source = source
-        self.pos = pos
-        self.size = size
+        self.card_source = None
+        self.opacity = 0
         self.allow_stretch = True
         self.keep_ratio = True
-        self.texture = CoreImage(source, keep_data=True).texture
+        self.show(source, pos, size)
+
+    def show(self, source, pos, size):
+        """Update the widget in place, touching only what changed.
+
+        The texture comes from the shared cache; setting Image.source would
+        make the widget load the file again.  A source of None hides the card.
+        """
+        if source != self.card_source:
+            self.card_source = source
+            if source is not None:
+                self.texture = get_texture(source)
+            self.opacity = 0 if source is None else 1
+        if tuple(self.pos) != pos:
+            self.pos = pos
+        if tuple(self.size) != size:
+            self.size = size
+
+# Dealt cards shown face up; older ones are hidden under them
+MAX_DISPLAY_CARDS = 5
+# How long the window must stop resizing before the buttons are moved
+RESIZE_SETTLE_SECONDS = 0.1
+# Card images decoded per frame while preloading after startup
+PRELOAD_PER_FRAME = 4
+
 
 class CardGame(Widget):
     dealt_cards = ListProperty([])
@@ -31,41 +103,114 @@ class CardGame(Widget):
     autoplay_active = BooleanProperty(False)
     is_portrait = BooleanProperty(True)
 
-    def __init__(self, **kwargs):
+    def __init__(self, replay_deck=None, **kwargs):
         super().__init__(**kwargs)
-        self.db = GameDatabase()
+        # Changes only mark the view dirty; the trigger lays it out at most
+        # once per frame however many changes came before it
+        self._redraw_trigger = Clock.create_trigger(self.update_card_positions)
+        # Window drags send a stream of resizes; the buttons follow once they stop
+        self._resize_trigger = Clock.create_trigger(self.layout_buttons, RESIZE_SETTLE_SECONDS)
+        # A deal from the archive to play first, in dealing order
+        self.replay_deck = replay_deck
+        # Opened after the first frame, or earlier if a result needs it
+        self.db = None
         self.game_start_time = time()
         Window.bind(on_resize=self._on_window_resize)
         
-        self.card_images = {}
+        self.card_images = []
         self.load_cards()
+        # Game state and rules live in the model; the widget mirrors it
+        self.model = GameModel()
+        self.model.bind(self._on_model_change)
+        self.game_recorded = False
         
         # Set initial size and orientation
         self.size = Window.size
         self.pos = (0, 0)
         self.is_portrait = Window.height > Window.width
-        
+
+        # Retained widgets and background: redraws update these in place
+        # instead of rebuilding them
+        with self.canvas.before:
+            Color(0, 0.5, 0)
+            self.background = Rectangle(pos=self.pos, size=self.size)
+        self.deck_widget = Card()
+        self.add_widget(self.deck_widget)
+        self.card_widgets = []
+        for i in range(MAX_DISPLAY_CARDS):
+            card_widget = Card()
+            self.card_widgets.append(card_widget)
+            self.add_widget(card_widget)
+
         self.setup_buttons()
         self.init_game()
         
-        self.bind(size=self.update_card_positions)
-        Clock.schedule_once(lambda dt: self.update_card_positions(), 0)
+        self.bind(size=self.request_redraw, is_portrait=self.request_redraw)
+        Window.bind(on_flip=self._on_first_frame)
+
+    def _on_first_frame(self, *args):
+        """Start the work that can wait until the game is on screen"""
+        Window.unbind(on_flip=self._on_first_frame)
+        startup_timing.mark('first_frame')
+        Clock.schedule_once(lambda dt: self.database(), 0)
+        self._preload = iter(self.card_images + [self.card_back])
+        self._preload_seconds = 0
+        Clock.schedule_interval(self._preload_step, 0)
+
+    def _preload_step(self, dt):
+        """Decode a few card images per frame so dealing never touches the disk"""
+        start = perf_counter()
+        for x in range(PRELOAD_PER_FRAME):
+            path = next(self._preload, None)
+            if path is None:
+                self._preload_seconds += perf_counter() - start
+                startup_timing.record('assets', self._preload_seconds)
+                return False
+            get_texture(path)
+        self._preload_seconds += perf_counter() - start
+        return True
+
+    def database(self):
+        """The results database, opened on first use"""
+        if self.db is None:
+            start = perf_counter()
+            from database import GameDatabase
+            self.db = GameDatabase()
+            startup_timing.record('db', perf_counter() - start)
+        return self.db
+
+    def request_redraw(self, *args):
+        self._redraw_trigger()
+
+    def _on_model_change(self, model, event):
+        self.dealt_cards = model.dealt_cards()
+        self.total_cards = model.total_cards
+        self.cards_in_deck = model.cards_in_deck
+        self.request_redraw()
 
     def _on_window_resize(self, instance, width, height):
         self.size = (width, height)
         self.is_portrait = height > width
-        self.setup_buttons()  # Recreate buttons for new orientation
+        # Restart the wait, so only the last resize of a drag moves the buttons
+        self._resize_trigger.cancel()
+        self._resize_trigger()
         
     def setup_buttons(self):
-        # Remove existing buttons and labels
-        for child in self.children[:]:
-            if isinstance(child, (Button, Label)):
-                self.remove_widget(child)
+        """Create the buttons and label once; layout_buttons() places them"""
+        self.check_btn = Button(text='Check', size_hint=(None, None))
+        self.check_btn.bind(on_press=self.check_cards)
+        self.redeal_btn = Button(text='Redeal', size_hint=(None, None))
+        self.redeal_btn.bind(on_press=self.init_game)
+        self.autoplay_btn = Button(text='Autoplay', size_hint=(None, None))
+        self.autoplay_btn.bind(on_press=self.toggle_autoplay)
+        self.turbo_btn = Button(text='Turbo', size_hint=(None, None))
+        self.turbo_btn.bind(on_press=self.turbo_autoplay)
+        self.buttons = [self.check_btn, self.redeal_btn, self.autoplay_btn, self.turbo_btn]
+        for button in self.buttons:
+            self.add_widget(button)
 
-        if self.is_portrait:
-            self._setup_portrait_buttons()
-        else:
-            self._setup_landscape_buttons()
+        self.cards_label = Label(text=f'Cards: {self.total_cards}', size_hint=(None, None))
+        self.add_widget(self.cards_label)
 
         self.stats_button = Button(
             text='Stats',
@@ -75,122 +220,54 @@ class CardGame(Widget):
         )
         self.stats_button.bind(on_press=self.show_stats)
         self.add_widget(self.stats_button)
+        self.layout_buttons()
 
-    def _setup_portrait_buttons(self):
-        button_width = Window.width * 0.1
-        button_height = Window.height * 0.067
-        button_y = Window.height * 0.033
-
-        self.check_btn = Button(
-            text='Check', 
-            size_hint=(None, None),
-            size=(button_width, button_height),
-            pos=(Window.width * 0.16, button_y)
-        )
-        self.check_btn.bind(on_press=self.check_cards)
-        self.add_widget(self.check_btn)
-
-        self.redeal_btn = Button(
-            text='Redeal',
-            size_hint=(None, None),
-            size=(button_width, button_height),
-            pos=(Window.width * 0.28, button_y)
-        )
-        self.redeal_btn.bind(on_press=self.init_game)
-        self.add_widget(self.redeal_btn)
-
-        self.autoplay_btn = Button(
-            text='Autoplay',
-            size_hint=(None, None),
-            size=(button_width, button_height),
-            pos=(Window.width * 0.40, button_y)
-        )
-        self.autoplay_btn.bind(on_press=self.toggle_autoplay)
-        self.add_widget(self.autoplay_btn)
-
-        # Move cards label to the right of stats button
-        self.cards_label = Label(
-            text=f'Cards: {self.total_cards}',
-            size_hint=(None, None),
-            size=(Window.width * 0.15, Window.height * 0.067),
-            pos=(Window.width * 0.85, Window.height * 0.95)  # Position to right of stats button
-        )
-        self.add_widget(self.cards_label)
-
-    def _setup_landscape_buttons(self):
-        button_width = Window.width * 0.06
-        button_height = Window.height * 0.1
-        button_x = Window.width * 0.92
-
-        self.check_btn = Button(
-            text='Check', 
-            size_hint=(None, None),
-            size=(button_width, button_height),
-            pos=(button_x, Window.height * 0.7)
-        )
-        self.check_btn.bind(on_press=self.check_cards)
-        self.add_widget(self.check_btn)
-
-        self.redeal_btn = Button(
-            text='Redeal',
-            size_hint=(None, None),
-            size=(button_width, button_height),
-            pos=(button_x, Window.height * 0.5)
-        )
-        self.redeal_btn.bind(on_press=self.init_game)
-        self.add_widget(self.redeal_btn)
-
-        self.autoplay_btn = Button(
-            text='Autoplay',
-            size_hint=(None, None),
-            size=(button_width, button_height),
-            pos=(button_x, Window.height * 0.3)
-        )
-        self.autoplay_btn.bind(on_press=self.toggle_autoplay)
-        self.add_widget(self.autoplay_btn)
-
-        # Update cards label position and ensure it's removed/readded
-        self.cards_label = Label(
-            text=f'Cards: {self.total_cards}',
-            size_hint=(None, None),
-            size=(button_width, button_height),
-            pos=(button_x, Window.height * 0.1)
-        )
-        self.add_widget(self.cards_label)
+    def layout_buttons(self, *args):
+        """Move and resize the buttons for the window size and orientation"""
+        if self.is_portrait:
+            button_size = (Window.width * 0.1, Window.height * 0.067)
+            button_y = Window.height * 0.033
+            positions = [(Window.width * x, button_y) for x in (0.16, 0.28, 0.40, 0.52)]
+            # Cards label to the right of the stats button
+            label_size = (Window.width * 0.15, Window.height * 0.067)
+            label_pos = (Window.width * 0.85, Window.height * 0.95)
+        else:
+            button_size = (Window.width * 0.06, Window.height * 0.1)
+            button_x = Window.width * 0.92
+            positions = [(button_x, Window.height * y) for y in (0.7, 0.55, 0.4, 0.25)]
+            label_size = button_size
+            label_pos = (button_x, Window.height * 0.1)
+
+        for button, pos in zip(self.buttons, positions):
+            button.size = button_size
+            button.pos = pos
+        self.cards_label.size = label_size
+        self.cards_label.pos = label_pos
 
     def load_cards(self):
-        suits = {'h': 'hearts', 'd': 'diamonds', 'c': 'clubs', 's': 'spades'}
-        ranks = {
-            '2': '2', '3': '3', '4': '4', '5': '5', '6': '6', '7': '7', '8': '8', 
-            '9': '9', '10': '10', 'j': 'jack', 'q': 'queen', 'k': 'king', 'a': 'ace'
-        }
-        
-        for suit_short, suit_long in suits.items():
-            for rank_short, rank_long in ranks.items():
-                filename = f"{rank_long}_of_{suit_long}.png"
-                path = os.path.join("resources", "cards", "pngfree", filename)
-                self.card_images[f"{rank_short}_of_{suit_short}"] = path
+        # card_images is indexed by the card ints from cards.py
+        self.card_images = [
+            os.path.join("resources", "cards", "pngfree", card_filename(card))
+            for card in range(DECK_SIZE)
+        ]
                 
         self.card_back = os.path.join("resources", "cards", "pngfree", "Card-Back.jpg")
 
     def init_game(self, *args):
         self.game_start_time = time()
-        suits = ['h', 'd', 'c', 's']
-        ranks = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'j', 'q', 'k', 'a']
-        self.deck = [f"{rank}_of_{suit}" for suit in suits for rank in ranks]
-        random.shuffle(self.deck)
-        self.dealt_cards = []
-        self.total_cards = 52
-        self.cards_in_deck = 52
-        self.autoplay_active = False
-        self.update_card_positions()
+        if self.autoplay_active:
+            self.toggle_autoplay()
+        self.game_recorded = False
+        self.model.new_game(self.replay_deck)
+        self.replay_deck = None
 
     def update_card_positions(self, *args):
-        self.canvas.before.clear()
-        with self.canvas.before:
-            Color(0, 0.5, 0)
-            Rectangle(pos=self.pos, size=self.size)
-            
+        """Lay out the deck, the dealt cards and the label; runs from the redraw trigger"""
+        if tuple(self.background.pos) != tuple(self.pos):
+            self.background.pos = self.pos
+        if tuple(self.background.size) != tuple(self.size):
+            self.background.size = self.size
+
         # Calculate card size based on orientation
         if self.is_portrait:
             card_width = Window.width * 0.125
@@ -203,68 +280,51 @@ class CardGame(Widget):
             deck_y = Window.height * 0.1
             cards_y = Window.height * 0.5  # Center cards vertically
             
-        card_height = card_width * 1.4
-        
-        # Remove existing cards
-        for child in self.children[:]:
-            if isinstance(child, Card):
-                self.remove_widget(child)
-                
+        card_size = (card_width, card_width * 1.4)
+
         # Draw deck
-        if self.cards_in_deck > 0:
-            deck_card = Card(
-                source=self.card_back,
-                pos=(deck_x, deck_y),
-                size=(card_width, card_height)
-            )
-            self.add_widget(deck_card)
-            
-        # Draw dealt cards
+        self.deck_widget.show(
+            self.card_back if self.cards_in_deck > 0 else None,
+            (deck_x, deck_y),
+            card_size
+        )
+
+        # Draw dealt cards, hiding the pooled widgets that are not needed
         display_cards = self.get_display_cards()
         card_spacing = card_width * 1.1
-        
-        for i, card in enumerate(display_cards):
+
+        for i, card_widget in enumerate(self.card_widgets):
             x_pos = deck_x + card_spacing + (i * card_spacing)
-            card_widget = Card(
-                source=self.card_images[card],
-                pos=(x_pos, cards_y),
-                size=(card_width, card_height)
-            )
-            self.add_widget(card_widget)
+            source = self.card_images[display_cards[i]] if i < len(display_cards) else None
+            card_widget.show(source, (x_pos, cards_y), card_size)
 
-        self.cards_label.text = f'Cards: {self.total_cards}'
-        
-        if self.check_game_over():
-            if self.autoplay_active:
-                self.toggle_autoplay()  # Stop autoplay
-            # Could add game over notification here
+        cards_text = f'Cards: {self.total_cards}'
+        if self.cards_label.text != cards_text:
+            self.cards_label.text = cards_text
 
     def get_display_cards(self):
-        return self.dealt_cards[-5:] if len(self.dealt_cards) > 5 else self.dealt_cards
+        if len(self.dealt_cards) > MAX_DISPLAY_CARDS:
+            return self.dealt_cards[-MAX_DISPLAY_CARDS:]
+        return self.dealt_cards
+
+    def deal_card(self):
+        self.model.deal()
 
     def check_cards(self, *args):
         if len(self.dealt_cards) >= 4:
-            current_card = self.dealt_cards[-1]
-            fourth_card = self.dealt_cards[-4]
-            
-            current_rank, current_suit = current_card.split('_of_')
-            fourth_rank, fourth_suit = fourth_card.split('_of_')
-            
-            if current_suit == fourth_suit:
-                del self.dealt_cards[-3:-1]
-                self.total_cards -= 2
-                print("Suit match! Removed middle two cards.")
-            elif current_rank == fourth_rank:
-                del self.dealt_cards[-4:]
-                self.total_cards -= 4
-                print("Rank match! Removed all four cards.")
-            else:
-                print("No match found.")
-        
-        self.update_card_positions()
-        if self.cards_in_deck == 0:  # Add this check
+            self._check()
+        if self.cards_in_deck == 0:
             self.check_game_over()
 
+    def _check(self):
+        match = self.model.check()
+        if match == SUIT_MATCH:
+            print("Suit match! Removed middle two cards.")
+        elif match == RANK_MATCH:
+            print("Rank match! Removed all four cards.")
+        else:
+            print("No match found.")
+
     def toggle_autoplay(self, *args):
         self.autoplay_active = not self.autoplay_active
         if self.autoplay_active:
@@ -274,11 +334,8 @@ class CardGame(Widget):
 
     def autoplay_step(self, dt):
         if self.cards_in_deck > 0:
-            dealt_card = self.deck.pop()
-            self.dealt_cards.append(dealt_card)
-            self.cards_in_deck -= 1
+            self.deal_card()
             self.check_cards()
-            self.update_card_positions()
             return True
         else:
             print("No more cards in the deck.")
@@ -306,47 +363,80 @@ class CardGame(Widget):
         if (deck_x <= touch.pos[0] <= deck_x + card_width and 
             deck_y <= touch.pos[1] <= deck_y + card_height):
             if self.cards_in_deck > 0:
-                dealt_card = self.deck.pop()
-                self.dealt_cards.append(dealt_card)
-                self.cards_in_deck -= 1
-                self.update_card_positions()
+                self.deal_card()
                 if self.cards_in_deck == 0:  # If this was the last card
+                    # game_over() makes the matches left on top first, as
+                    # the redraw's check_game_over() used to before this call
                     self.game_over()  # Directly trigger game over
                 return True
         return False
 
+    def turbo_autoplay(self, *args, games=1):
+        """Finish the game in progress as the Computer, then play games - 1 more.
+
+        Games run in a tight loop and only the final state is rendered.
+        """
+        if self.autoplay_active:
+            self.toggle_autoplay()
+        if self.game_recorded:
+            # The last game is over and saved, so turbo starts the next one
+            self.init_game()
+        self.model.play_autoplay()
+        for x in range(games - 1):
+            self.record_result(True)
+            self.init_game()
+            self.model.play_autoplay()
+        self.game_over(was_autoplay=True)
+
     def check_game_over(self):
-        if self.cards_in_deck == 0:
-            # Do one final check of the cards
-            if len(self.dealt_cards) >= 4:
-                current_card = self.dealt_cards[-1]
-                fourth_card = self.dealt_cards[-4]
-                
-                current_rank, current_suit = current_card.split('_of_')
-                fourth_rank, fourth_suit = fourth_card.split('_of_')
-                
-                if current_suit == fourth_suit or current_rank == fourth_rank:
-                    # There's still a valid move
-                    self.check_cards()  # Perform the move
-                    return False
-
-                # Check for any other possible matches
-                for i in range(len(self.dealt_cards)-3):
-                    current_card = self.dealt_cards[-1]
-                    fourth_card = self.dealt_cards[i]
-                    
-                    current_rank, current_suit = current_card.split('_of_')
-                    fourth_rank, fourth_suit = fourth_card.split('_of_')
-                    
-                    if current_suit == fourth_suit or current_rank == fourth_rank:
-                        return False  # Still have possible matches
-            
+        if self.cards_in_deck == 0 and not self.game_recorded:
+            # Make the moves that are left on top of the pile
+            while self.model.can_check():
+                self._check()
+
+            # Check for any other possible matches
+            if not self.model.is_over():
+                return False  # Still have possible matches
+
             print("Triggering game over sequence")  # Debug print
             self.game_over()  # This should trigger game over
             return True
         return False
 
-    def game_over(self):
+    def record_result(self, is_autoplay):
+        """Save the finished game to the database once and return its duration"""
+        self.game_recorded = True
+        # Calculate duration and status
+        duration = int(time() - self.game_start_time)
+        status = "won" if self.total_cards == 0 else "completed"
+        
+        # Debug prints
+        print(f"Duration: {duration} seconds")
+        print(f"Status: {status}")
+        print(f"Was Autoplay: {is_autoplay}")
+        
+        # Save game result; the write happens on the database thread
+        self.database().save_game_result(
+            is_autoplay=is_autoplay,
+            cards_remaining=self.total_cards,
+            duration_seconds=duration,
+            status=status,
+            callback=self._on_result_saved
+        )
+        return duration
+
+    def _on_result_saved(self, future):
+        # Called on the database writer thread
+        if future.exception() is not None:
+            print(f"Error saving game result: {future.exception()}")
+
+    def game_over(self, was_autoplay=None):
+        # Several paths can end a game; only the first one records it
+        if self.game_recorded:
+            return
+        if not self.model.finished:
+            self.model.finish()
+
         # Debug prints
         print("\n=== Game Over Debug ===")
         print(f"Game Start Time: {self.game_start_time}")
@@ -355,42 +445,28 @@ class CardGame(Widget):
         print(f"Autoplay Active: {self.autoplay_active}")
         
         # Save the autoplay state before turning it off
-        was_autoplay = self.autoplay_active
+        if was_autoplay is None:
+            was_autoplay = self.autoplay_active
         
         # Stop autoplay if active
         if self.autoplay_active:
             self.toggle_autoplay()
 
-        # Calculate duration and status
-        duration = int(time() - self.game_start_time)
-        status = "won" if self.total_cards == 0 else "completed"
-        
-        # Debug prints
-        print(f"Duration: {duration} seconds")
-        print(f"Status: {status}")
-        print(f"Was Autoplay: {was_autoplay}")
-        
-        # Save game result
-        try:
-            self.db.save_game_result(
-                is_autoplay=was_autoplay,  # Use the saved state
-                cards_remaining=self.total_cards,
-                duration_seconds=duration,
-                status=status
-            )
-            print("Game result saved successfully")
-        except Exception as e:
-            print(f"Error saving game result: {e}")
+        duration = self.record_result(was_autoplay)
 
         # Show game over popup
+        ranking = ranking_text(self.total_cards, bool(was_autoplay))
+        ranking_line = f"{ranking[:1].upper() + ranking[1:]}\n" if ranking else ''
         message = (
             f"Game Over!\n\n"
             f"{'🏆 Perfect Game! 🏆' if self.total_cards == 0 else ''}\n"
             f"Cards Remaining: {self.total_cards}\n"
+            f"{ranking_line}"
             f"Time Played: {duration//60}m {duration%60}s\n"
             f"Mode: {'Computer' if was_autoplay else 'Human'}"  # Use the saved state
         )
         
+        from kivy.uix.popup import Popup
         popup = Popup(
             title='Game Over',
             content=Label(text=message),
@@ -399,7 +475,9 @@ class CardGame(Widget):
         popup.open()
 
     def show_stats(self, instance):
-        stats = self.db.get_stats()
+        from kivy.uix.popup import Popup
+
+        stats = self.database().get_stats()
         popup_text = "Game Statistics:\n\n"
         
         for row in stats:
@@ -412,7 +490,8 @@ class CardGame(Widget):
             popup_text += f"{game_type} Games:\n"
             popup_text += f"Games Played: {games_played}\n"
             popup_text += f"Average Cards Left: {avg_cards}\n"
-            popup_text += f"Best Result: {best_result} cards\n"
+            ranking = ranking_text(best_result, bool(row[0])) if games_played else ''
+            popup_text += f"Best Result: {best_result} cards{f' ({ranking})' if ranking else ''}\n"
             popup_text += f"Total Wins: {wins}\n\n"
         
         popup = Popup(
@@ -423,8 +502,39 @@ class CardGame(Widget):
         popup.open()
 
 class CardApp(App):
+    def __init__(self, replay_deck=None, **kwargs):
+        super().__init__(**kwargs)
+        self.replay_deck = replay_deck
+
     def build(self):
-        return CardGame()
+        self.game = CardGame(replay_deck=self.replay_deck)
+        return self.game
+
+    def on_pause(self):
+        # The OS may kill a paused app, so commit queued results first
+        if self.game.db is not None:
+            self.game.db.flush()
+        return True
+
+    def on_stop(self):
+        if self.game.db is not None:
+            self.game.db.close()
 
 if __name__ == '__main__':
-    CardApp().run()
+    # Kivy reads its own options first; ours go after '--', e.g.
+    # python main.py -- --archive deals.db --deal 12345
+    import argparse
+    parser = argparse.ArgumentParser(description='Lazy Solitaire')
+    parser.add_argument('--archive', default='deals.db', help='deal archive written by simulator.py --archive')
+    parser.add_argument('--deal', type=int, default=None, help='start with this deal from the archive')
+    args = parser.parse_args()
+
+    replay_deck = None
+    if args.deal is not None:
+        from deal_archive import DealArchive
+        archive = DealArchive(args.archive)
+        replay_deck = archive.deck(args.deal)
+        archive.close()
+        if replay_deck is None:
+            raise SystemExit(f"No deal {args.deal} in {args.archive}")
+    CardApp(replay_deck=replay_deck).run()
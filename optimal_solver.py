@@ -0,0 +1,530 @@
+"""Best achievable cards remaining for a deal when the player chooses when to Check.
+
+simulator.py resolves every match as soon as it appears.  In the graphical
+game the player may also keep dealing and leave a match for later: the card
+can come back to the top when the four cards above it are removed by a rank
+match.  Two different cards never share both rank and suit, so the only real
+choice at any point is whether to make the match on top or to deal.
+
+The search walks those choices depth first with a transposition table of
+(pile, cards dealt) nodes, trying matches before deals so the greedy line is
+found first.  Once the deck is empty every move is forced, so those nodes are
+played out rather than stored.  A node is cut when a lower bound on its result
+already reaches the best line found above it: cards at the bottom of the pile
+that can never be matched again or dug out by the cards still to deal (see
+_floor), rounded up to the parity of the cards in play (every match removes
+two or four cards), and at least two when the pile can never be emptied in
+runs (see _find_clearable).  Deals where the search exceeds its node budget
+report the best line found so far; --deals counts them with it, so its
+optimal results are then upper bounds and its gaps lower bounds, and says how
+many there were.
+
+    python optimal_solver.py --deck "a_of_h 2_of_h 3_of_h ..."
+    python optimal_solver.py --deals 10000 --seed 1 --workers 8
+    python optimal_solver.py --verify 200
+
+--verify replays the solver's lines on REGRESSION_DECKS and random deals, and
+checks its results on their first VERIFY_CARDS cards against an exhaustive
+search.
+"""
+import argparse
+import os
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from cards import DECK_SIZE, RANK_NAMES, RANK_OF, SUIT_NAMES, SUIT_OF, card_from_name, card_name, new_deck
+from resolver import RANK_MATCH, SUIT_MATCH, Resolver
+
+DEAL = 'deal'
+MAX_NODES = 2000000
+DEALS_PER_CHUNK = 10
+VERIFY_CARDS = 24
+
+# Deals that once broke the solver, dealt from the front
+REGRESSION_DECKS = (
+    # _can_clear looked for a run ending past the last card
+    (19, 42, 32, 10, 40, 34, 30, 13, 33, 7, 8, 44, 5, 31, 26, 35, 28, 1, 39, 18, 3, 47, 36, 15, 45, 14,
+     38, 16, 12, 20, 2, 29, 22, 49, 4, 51, 48, 23, 46, 24, 21, 41, 11, 6, 43, 25, 50, 0, 9, 37, 27, 17),
+)
+
+# bytes.translate() tables from a pile to its ranks and suits
+RANK_TABLE = RANK_OF + bytes(256 - DECK_SIZE)
+SUIT_TABLE = SUIT_OF + bytes(256 - DECK_SIZE)
+
+
+class SearchLimit(Exception):
+    pass
+
+
+class OptimalSolver:
+    """Finds the fewest cards a deal can end with and a sequence of moves that gets there"""
+
+    def __init__(self, max_nodes=MAX_NODES):
+        self.max_nodes = max_nodes
+        self.greedy = Resolver()
+
+    def solve(self, deck):
+        """Return (cards remaining, moves, proven) for a deck dealt from the front.
+
+        moves is a list of DEAL, RANK_MATCH and SUIT_MATCH.  proven is False
+        when the node budget ran out; the result is then the best line found
+        so far, never worse than greedy.
+        """
+        self.deck = bytes(deck)
+        size = len(self.deck)
+        self._find_clearable()
+        self.exact = {}
+        self.lower = {}
+        # The best complete line seen by the search, and the moves to the current node
+        self.incumbent, self.incumbent_moves = self._greedy_moves()
+        self.path = []
+        try:
+            remaining = self._best(b'', 0, size + 1)
+            moves = self._moves(remaining)
+            proven = True
+        except SearchLimit:
+            remaining = self.incumbent
+            moves = self.incumbent_moves
+            proven = False
+        self.exact = self.lower = self.path = None
+        return remaining, moves, proven
+
+    def _find_clearable(self):
+        """Index the deck by rank and suit and find which runs could be cleared from an empty pile.
+
+        The pile only empties through a rank match at height four, so a won
+        game splits into runs of deals that each start on an empty pile, hold
+        an even number (at least four) of cards and contain a second card of
+        their first card's rank.  clearable[i] is False when the cards from i
+        on cannot be split that way; ends_clearable[parity][i] is True when a
+        run can end on a card at i or later with that index parity and leave a
+        clearable rest.
+        """
+        deck = self.deck
+        size = len(deck)
+        # next_rank[i][rank] is the first index >= i holding that rank, or size
+        self.next_rank = [None] * (size + 1)
+        self.next_suit = [None] * (size + 1)
+        next_rank = [size] * len(RANK_NAMES)
+        next_suit = [size] * len(SUIT_NAMES)
+        self.next_rank[size] = tuple(next_rank)
+        self.next_suit[size] = tuple(next_suit)
+        # suit_ranks[i][suit] is the set of ranks of that suit from index i on
+        self.suit_ranks = [None] * (size + 1)
+        suit_ranks = [frozenset()] * len(SUIT_NAMES)
+        self.suit_ranks[size] = tuple(suit_ranks)
+        clearable = [False] * (size + 1)
+        clearable[size] = True
+        ends_clearable = [[False] * (size + 1), [False] * (size + 1)]
+        for start in range(size - 1, -1, -1):
+            rank = RANK_OF[deck[start]]
+            end = max(start + 3, next_rank[rank])
+            if end < size:
+                clearable[start] = ends_clearable[(start + 1) & 1][end]
+            next_rank[rank] = start
+            next_suit[SUIT_OF[deck[start]]] = start
+            self.next_rank[start] = tuple(next_rank)
+            self.next_suit[start] = tuple(next_suit)
+            suit_ranks[SUIT_OF[deck[start]]] |= {rank}
+            self.suit_ranks[start] = tuple(suit_ranks)
+            for parity in (0, 1):
+                ends_clearable[parity][start] = ends_clearable[parity][start + 1] or (
+                    start & 1 == parity and clearable[start + 1])
+        self.clearable = clearable
+        self.ends_clearable = ends_clearable
+
+    def _can_clear(self, pile, ranks, dealt):
+        """False if no line from this node can ever empty the pile and finish with no cards"""
+        if not pile:
+            return self.clearable[dealt]
+        height = len(pile)
+        # The first run ends on the last card dealt before the pile empties
+        end = max(dealt - 1, dealt + 3 - height)
+        if ranks.find(ranks[0], 1) < 0:
+            end = max(end, self.next_rank[dealt][ranks[0]])
+        if end >= len(self.deck):
+            # The run would need cards the deck no longer has
+            return False
+        return self.ends_clearable[(dealt + 1 + height) & 1][end]
+
+    def _children(self, pile, dealt):
+        """The (move, pile, dealt) nodes reachable with one move, matches first"""
+        children = []
+        if len(pile) >= 4:
+            top = pile[-1]
+            fourth = pile[-4]
+            if RANK_OF[top] == RANK_OF[fourth]:
+                children.append((RANK_MATCH, pile[:-4], dealt))
+            elif SUIT_OF[top] == SUIT_OF[fourth]:
+                children.append((SUIT_MATCH, pile[:-3] + pile[-1:], dealt))
+        if dealt < len(self.deck):
+            children.append((DEAL, pile + self.deck[dealt:dealt + 1], dealt + 1))
+        return children
+
+    def _bound(self, pile, dealt):
+        """A lower bound on the cards remaining from this node.
+
+        A card at the bottom of the pile can only leave as the fourth card of a
+        rank match or between two cards of the same suit, one below it and one
+        above.  Counting up from the bottom, a card is stuck if nothing above it
+        shares its rank and nothing above it shares a suit with a stuck card.
+        The cards under _floor() are never played either.
+        """
+        size = len(self.deck)
+        next_rank = self.next_rank[dealt]
+        next_suit = self.next_suit[dealt]
+        ranks = pile.translate(RANK_TABLE)
+        suits = pile.translate(SUIT_TABLE)
+        stuck = 0
+        stuck_suits = []
+        for rank in ranks:
+            if ranks.find(rank, stuck + 1) >= 0 or next_rank[rank] < size:
+                break
+            if any(suits.find(suit, stuck + 1) >= 0 or next_suit[suit] < size for suit in stuck_suits):
+                break
+            if suits[stuck] not in stuck_suits:
+                stuck_suits.append(suits[stuck])
+            stuck += 1
+        kept = max(stuck, self._floor(ranks, suits, dealt))
+        in_play = len(pile) + len(self.deck) - dealt
+        bound = kept + ((in_play - kept) & 1)
+        if bound == 0 and not self._can_clear(pile, ranks, dealt):
+            bound = 2
+        return bound
+
+    def _floor(self, ranks, suits, dealt):
+        """How many cards at the bottom of the pile stay there whatever is played.
+
+        Call the pile's cards that have not moved yet the floor.  A match that
+        takes cards off it has its fourth card among the floor's top four, and
+        its top card is the floor's own top card or a card dealt later that
+        sits on the floor, directly or over one or two other cards.  A card
+        sitting directly on the floor takes the two floor cards under it with
+        each suit match, and itself and three with a rank match.  The cards
+        above the floor stay in the order they were dealt and such a match
+        takes every one under its top card, so the cards still to deal dig in
+        dealing order, each for one turn.  Letting the floor's own top card
+        dig whenever it matches, and a card that slid down by suit match by
+        any rank of its suit still to come, gives the lowest floor any line
+        can reach.
+        """
+        size = len(self.deck)
+        # diggers[height] is the first card that may still dig once the floor
+        # is down to height, or more than size if it cannot get there
+        diggers = [size + 1] * (len(ranks) + 1)
+        diggers[len(ranks)] = dealt
+        for top in range(len(ranks), 0, -1):
+            first = diggers[top]
+            if first > size:
+                continue
+            # (height, suit, ranks, first) of cards sitting on the floor, which may match down it
+            sitting = []
+            if top >= 4:
+                if ranks[top - 1] == ranks[top - 4] and diggers[top - 4] > first:
+                    diggers[top - 4] = first
+                if suits[top - 1] == suits[top - 4]:
+                    sitting.append((top - 3, suits[top - 1], (ranks[top - 1],), first))
+            if first < size:
+                next_rank = self.next_rank[first]
+                next_suit = self.next_suit[first]
+                # A rank match by a card dealt two, one or no cards above the
+                # floor; next_rank is size when there is none, which leaves
+                # diggers at size + 1
+                used = next_rank[ranks[top - 1]] + 1
+                if diggers[top - 1] > used:
+                    diggers[top - 1] = used
+                # A card dealt one card above the floor may suit match down to
+                # it, and one dealt on the floor down it
+                if top >= 2:
+                    used = next_rank[ranks[top - 2]] + 1
+                    if diggers[top - 2] > used:
+                        diggers[top - 2] = used
+                    suit = suits[top - 2]
+                    if next_suit[suit] < size:
+                        sitting.append((top - 1, suit, self.suit_ranks[first][suit], next_suit[suit] + 1))
+                if top >= 3:
+                    used = next_rank[ranks[top - 3]] + 1
+                    if diggers[top - 3] > used:
+                        diggers[top - 3] = used
+                    suit = suits[top - 3]
+                    if next_suit[suit] < size:
+                        sitting.append((top - 2, suit, self.suit_ranks[first][suit], next_suit[suit] + 1))
+            for height, suit, digger_ranks, used in sitting:
+                while True:
+                    if diggers[height] > used:
+                        diggers[height] = used
+                    if height < 3:
+                        break
+                    if ranks[height - 3] in digger_ranks and diggers[height - 3] > used:
+                        diggers[height - 3] = used
+                    if suits[height - 3] != suit:
+                        break
+                    height -= 2
+        return next(height for height, first in enumerate(diggers) if first <= size)
+
+    def _finish(self, pile):
+        """Cards remaining once the deck is empty: every move is forced from here"""
+        resolver = self.greedy
+        resolver.pile[:len(pile)] = pile
+        resolver.height = len(pile)
+        matches = []
+        match = resolver.step()
+        while match is not None:
+            matches.append(match)
+            match = resolver.step()
+        if len(resolver) < self.incumbent:
+            self.incumbent = len(resolver)
+            self.incumbent_moves = self.path + matches
+        return len(resolver)
+
+    def _best(self, pile, dealt, alpha):
+        """The fewest cards remaining from this node if that is below alpha, else a lower bound >= alpha"""
+        if dealt == len(self.deck):
+            return self._finish(pile)
+        key = (pile, dealt)
+        remaining = self.exact.get(key)
+        if remaining is not None:
+            return remaining
+        bound = self.lower.get(key)
+        if bound is None:
+            bound = self._bound(pile, dealt)
+        if bound >= alpha:
+            return bound
+        if len(self.exact) + len(self.lower) >= self.max_nodes:
+            raise SearchLimit
+
+        children = self._children(pile, dealt)
+        if not children:
+            self.exact[key] = len(pile)
+            return len(pile)
+
+        best = None
+        cutoff = alpha
+        for move, child, child_dealt in children:
+            self.path.append(move)
+            remaining = self._best(child, child_dealt, cutoff)
+            self.path.pop()
+            if best is None or remaining < best:
+                best = remaining
+            cutoff = min(cutoff, remaining)
+            if cutoff <= bound:
+                break
+        if best < alpha:
+            self.exact[key] = best
+        else:
+            self.lower[key] = max(bound, best)
+        return best
+
+    def _moves(self, remaining):
+        """Follow the transposition table from the root along a line that ends with remaining cards"""
+        moves = []
+        pile = b''
+        dealt = 0
+        children = self._children(pile, dealt)
+        while children:
+            for move, child, child_dealt in children:
+                if self._best(child, child_dealt, remaining + 1) == remaining:
+                    break
+            moves.append(move)
+            pile = child
+            dealt = child_dealt
+            children = self._children(pile, dealt)
+        return moves
+
+    def _greedy_moves(self):
+        """The simulator's line: make every match as soon as it appears"""
+        moves = []
+        resolver = self.greedy
+        resolver.reset()
+        for card in self.deck:
+            resolver.add(card)
+            moves.append(DEAL)
+            match = resolver.step()
+            while match is not None:
+                moves.append(match)
+                match = resolver.step()
+        return len(resolver), moves
+
+
+def replay(deck, moves):
+    """Play moves on deck and return the cards remaining; ValueError if a move is not allowed"""
+    solver = OptimalSolver()
+    solver.deck = bytes(deck)
+    pile = b''
+    dealt = 0
+    for move in moves:
+        children = {child_move: (child, child_dealt)
+                    for child_move, child, child_dealt in solver._children(pile, dealt)}
+        if move not in children:
+            raise ValueError(f"{move} is not allowed after {dealt} cards with {len(pile)} in the pile")
+        pile, dealt = children[move]
+    if dealt < len(deck):
+        raise ValueError(f"The moves stop after {dealt} of {len(deck)} cards")
+    return len(pile)
+
+
+def exhaustive(deck):
+    """The fewest cards remaining for deck found by trying every line, without bounds"""
+    solver = OptimalSolver()
+    solver.deck = bytes(deck)
+    best = {}
+
+    def search(pile, dealt):
+        key = (pile, dealt)
+        if key not in best:
+            children = solver._children(pile, dealt)
+            best[key] = min((search(child, child_dealt) for move, child, child_dealt in children),
+                            default=len(pile))
+        return best[key]
+
+    return search(b'', 0)
+
+
+def verify(count, seed=0, max_nodes=MAX_NODES):
+    """Check the solver on REGRESSION_DECKS and count random deals.
+
+    Every line it returns must replay to its result and do no worse than
+    greedy, and on the first VERIFY_CARDS cards of each deal its result must
+    equal exhaustive().  Returns the number of deals that failed.
+    """
+    rng = random.Random(seed)
+    solver = OptimalSolver(max_nodes)
+    greedy = Resolver()
+    decks = [list(deck) for deck in REGRESSION_DECKS]
+    deck = new_deck()
+    for x in range(count):
+        rng.shuffle(deck)
+        decks.append(deck[:])
+    failures = 0
+    for index, deck in enumerate(decks):
+        problems = []
+        for cards in (deck[:VERIFY_CARDS], deck):
+            try:
+                remaining, moves, proven = solver.solve(cards)
+                replayed = replay(cards, moves)
+            except Exception as e:
+                problems.append(f"{len(cards)} cards: {type(e).__name__}: {e}")
+                continue
+            if replayed != remaining:
+                problems.append(f"{len(cards)} cards: the line leaves {replayed}, not {remaining}")
+            if remaining > greedy.play(cards):
+                problems.append(f"{len(cards)} cards: {remaining} is worse than greedy")
+            if len(cards) == VERIFY_CARDS and proven and remaining != exhaustive(cards):
+                problems.append(f"{len(cards)} cards: {remaining}, exhaustive search finds {exhaustive(cards)}")
+        if problems:
+            failures += 1
+            print(f"Deck {' '.join(map(str, deck))}: " + '; '.join(problems))
+    print(f"Verified {len(decks)} deals, {failures} failed.")
+    return failures
+
+
+def solve_chunk(count, seed, max_nodes=MAX_NODES):
+    """Solve count random deals from one stream.
+
+    Returns Counters of greedy results, optimal results and greedy - optimal
+    gaps, and a Counter of the gaps of the deals that hit the node budget.
+    Those deals are counted with the best line found, so their optimal
+    result is an upper bound and their gap a lower bound.
+    """
+    rng = random.Random(':'.join(map(str, seed)))
+    solver = OptimalSolver(max_nodes)
+    greedy = Resolver()
+    deck = new_deck()
+    greedy_results = Counter()
+    optimal_results = Counter()
+    gaps = Counter()
+    unproven = Counter()
+    for x in range(count):
+        rng.shuffle(deck)
+        greedy_remaining = greedy.play(deck)
+        remaining, moves, proven = solver.solve(deck)
+        if not proven:
+            unproven[greedy_remaining - remaining] += 1
+        greedy_results[greedy_remaining] += 1
+        optimal_results[remaining] += 1
+        gaps[greedy_remaining - remaining] += 1
+    return greedy_results, optimal_results, gaps, unproven
+
+
+def solve_deals(count, seed, workers, max_nodes=MAX_NODES):
+    """solve_chunk() over count deals split into chunks across worker processes"""
+    sizes = [min(DEALS_PER_CHUNK, count - start) for start in range(0, count, DEALS_PER_CHUNK)]
+    seeds = [(seed, chunk) for chunk in range(len(sizes))]
+    greedy_results = Counter()
+    optimal_results = Counter()
+    gaps = Counter()
+    unproven = Counter()
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    mapper = executor.map if executor is not None else map
+    for chunk in mapper(solve_chunk, sizes, seeds, [max_nodes] * len(sizes)):
+        greedy_results.update(chunk[0])
+        optimal_results.update(chunk[1])
+        gaps.update(chunk[2])
+        unproven.update(chunk[3])
+    if executor is not None:
+        executor.shutdown()
+    return greedy_results, optimal_results, gaps, unproven
+
+
+def mean(counts):
+    return sum(value * n for value, n in counts.items()) / max(1, sum(counts.values()))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Best achievable cards remaining when Check may be delayed.')
+    parser.add_argument('--deck', default=None,
+                        help='solve one deal given as 52 card names, first dealt first (e.g. "a_of_h 10_of_s k_of_d ...")')
+    parser.add_argument('--deals', type=int, default=None,
+                        help='solve this many random deals and report the greedy vs optimal gap')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--max-nodes', type=int, default=MAX_NODES,
+                        help=f'nodes searched per deal before falling back to greedy (default: {MAX_NODES})')
+    parser.add_argument('--verify', type=int, metavar='DEALS', default=None,
+                        help='check the solver on the regression deals and this many random deals and exit')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.verify is not None:
+        raise SystemExit(1 if verify(args.verify, args.seed, args.max_nodes) else 0)
+    if args.deals is not None:
+        greedy_results, optimal_results, gaps, unproven = solve_deals(
+            args.deals, args.seed, args.workers, args.max_nodes)
+        # Deals that hit the node budget count with their best line, so the
+        # optimal results are upper bounds and the gaps lower bounds
+        at_most = " at most" if unproven else ""
+        at_least = " at least" if unproven else ""
+        print("gap deals unproven")
+        for gap in sorted(gaps):
+            print(f"{gap} {gaps[gap]} {unproven[gap]}")
+        print(f"Greedy mean {mean(greedy_results):.3f}, optimal mean{at_most} {mean(optimal_results):.3f}, "
+              f"greedy wins {greedy_results[0]}, optimal wins{at_least} {optimal_results[0]} "
+              f"of {sum(gaps.values())} deals.")
+        if unproven:
+            print(f"{sum(unproven.values())} deals hit the node budget and count with the best line found, "
+                  "which may leave more cards than the best play.")
+    else:
+        if args.deck:
+            deck = [card_from_name(name) for name in args.deck.split()]
+        else:
+            deck = new_deck()
+            random.Random(args.seed).shuffle(deck)
+        if sorted(deck) != list(range(DECK_SIZE)):
+            raise SystemExit("--deck must name all 52 cards once")
+        greedy_remaining = Resolver().play(deck)
+        remaining, moves, proven = OptimalSolver(args.max_nodes).solve(deck)
+        print("Deck: " + ' '.join(card_name(card) for card in deck))
+        line = []
+        dealt = 0
+        for move in moves:
+            if move == DEAL:
+                line.append(card_name(deck[dealt]))
+                dealt += 1
+            else:
+                line.append(f"[{move}]")
+        print("Moves: " + ' '.join(line))
+        print(f"Greedy leaves {greedy_remaining} cards, best play leaves {remaining}"
+              + ("." if proven else " (node budget reached, best line found so far)."))
@@ -0,0 +1,138 @@
+"""Per-game outcomes stored as memory-mapped uint8 column files.
+
+simulator.py --outcomes DIR appends one byte per game to DIR/remaining.u8
+(and with --outcome-matches to rank_matches.u8 and suit_matches.u8) after
+every round, so a run of 10^10 games costs 10 GB per column on disk and
+nothing in memory.  Games are stored in the order they were played: round by
+round, worker by worker.  Readers map the files instead of loading them:
+
+    python outcome_columns.py DIR --start 0 --stop 1000000000
+"""
+import argparse
+import json
+import mmap
+import os
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # readers fall back to memoryviews of the mapped files
+    np = None
+
+from cards import DECK_SIZE
+
+COLUMNS = ('remaining', 'rank_matches', 'suit_matches')
+META_FILE = 'columns.json'
+
+
+def column_path(directory, name):
+    return os.path.join(directory, f"{name}.u8")
+
+
+class OutcomeWriter:
+    """Appends rounds of per-game outcomes to the column files in a directory.
+
+    columns.json records which columns are kept, the campaign they belong to
+    and the campaign game the files start at.  When a campaign is resumed,
+    games past its last saved round are cut off, because that round is played
+    again.
+    """
+
+    def __init__(self, directory, columns=('remaining',), campaign=None, games_done=0):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        meta_path = os.path.join(directory, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as file:
+                meta = json.load(file)
+            if campaign is None or meta['campaign'] != campaign:
+                raise ValueError(f"{directory} already holds outcomes from another run")
+            columns = meta['columns']
+        else:
+            meta = {'columns': list(columns), 'campaign': campaign, 'first_game': games_done}
+            with open(meta_path, 'w') as file:
+                json.dump(meta, file)
+
+        self.columns = tuple(columns)
+        keep = games_done - meta['first_game']
+        self.files = {}
+        for name in self.columns:
+            file = open(column_path(directory, name), 'ab')
+            if file.tell() > keep:
+                file.truncate(keep)
+            self.files[name] = file
+
+    def append(self, games):
+        """Append one round from a dict of column name -> bytes, one uint8 per game"""
+        for name, file in self.files.items():
+            file.write(games[name])
+            file.flush()
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+
+
+class OutcomeColumns:
+    """Read-only view of a directory written by OutcomeWriter.
+
+    column() maps a file without copying it: a numpy memmap when numpy is
+    installed, otherwise a memoryview of an mmap.  Slicing either is free.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE)) as file:
+            meta = json.load(file)
+        self.columns = tuple(meta['columns'])
+        self.campaign = meta['campaign']
+        self.first_game = meta['first_game']
+        self.games = min(os.path.getsize(column_path(directory, name)) for name in self.columns)
+        self.maps = []
+
+    def column(self, name='remaining'):
+        if name not in self.columns:
+            raise KeyError(f"{self.directory} has no {name} column")
+        path = column_path(self.directory, name)
+        if not self.games:
+            return memoryview(b'')
+        if np is not None:
+            return np.memmap(path, dtype=np.uint8, mode='r', shape=(self.games,))
+        with open(path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.maps.append(mapped)
+        return memoryview(mapped)[:self.games]
+
+    def histogram(self, name='remaining', start=0, stop=None, chunk=1 << 26):
+        """Counter of values in games [start, stop), read a chunk at a time"""
+        column = self.column(name)
+        stop = self.games if stop is None else min(stop, self.games)
+        counts = Counter()
+        for offset in range(start, stop, chunk):
+            part = column[offset:min(offset + chunk, stop)]
+            if np is not None:
+                counts.update({value: int(n) for value, n in enumerate(np.bincount(part, minlength=DECK_SIZE + 1)) if n})
+            else:
+                counts.update(part.tobytes())
+        return counts
+
+    def close(self):
+        for mapped in self.maps:
+            mapped.close()
+        self.maps = []
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Histogram of a slice of stored per-game outcomes.')
+    parser.add_argument('directory')
+    parser.add_argument('--column', default='remaining', choices=COLUMNS)
+    parser.add_argument('--start', type=int, default=0)
+    parser.add_argument('--stop', type=int, default=None)
+    args = parser.parse_args()
+
+    outcomes = OutcomeColumns(args.directory)
+    counts = outcomes.histogram(args.column, args.start, args.stop)
+    for value in sorted(counts):
+        print(f"{value} {counts[value]}")
+    print(f"{sum(counts.values())} of {outcomes.games} games.")
+    outcomes.close()
@@ -0,0 +1,110 @@
+"""Cumulative distribution of simulated results, shipped with the app.
+
+The app cannot run the simulator or query simulator.db, so this build step
+turns the solitare histogram into a small binary table:
+
+    python outcome_table.py --db simulator.db --out resources/outcomes.cdf
+
+The simulator makes every match as soon as it appears.  The Computer only
+presses Check once per card dealt and wins about four times less often, so
+Computer games are ranked against a second table played by GameModel itself:
+
+    python outcome_table.py --computer-games 5000000 --seed 2024
+
+The file is an 8-byte header (magic, version, number of entries) followed by
+one little-endian uint64 per result 0-52: the number of simulated deals that
+ended with that many cards or fewer.  The last entry is the number of deals.
+OutcomeTable maps the file and answers a percentile with a single read.
+"""
+import argparse
+import mmap
+import os
+import struct
+
+from cards import DECK_SIZE
+
+TABLE_PATH = os.path.join('resources', 'outcomes.cdf')
+COMPUTER_TABLE_PATH = os.path.join('resources', 'outcomes-computer.cdf')
+MAGIC = b'LSCD'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')
+ENTRY = struct.Struct('<Q')
+
+
+def write_table(counts, path=TABLE_PATH):
+    """Write a Counter of cards remaining as a cumulative table, replacing path atomically"""
+    cumulative = []
+    total = 0
+    for remaining in range(DECK_SIZE + 1):
+        total += counts[remaining]
+        cumulative.append(total)
+    if not total:
+        raise ValueError("No games to build the table from")
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(cumulative)))
+        file.write(struct.pack(f'<{len(cumulative)}Q', *cumulative))
+    os.replace(temp_path, path)
+    return total
+
+
+class OutcomeTable:
+    """Read-only, memory-mapped view of a table written by write_table()"""
+
+    def __init__(self, path=TABLE_PATH):
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, entries = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION or entries != DECK_SIZE + 1 \
+                or len(self.map) != HEADER.size + entries * ENTRY.size:
+            self.map.close()
+            raise ValueError(f"{path} is not a version {VERSION} outcome table")
+        self.games = self.at_most(DECK_SIZE)
+
+    def at_most(self, remaining):
+        """Number of simulated deals that ended with remaining cards or fewer"""
+        return ENTRY.unpack_from(self.map, HEADER.size + remaining * ENTRY.size)[0]
+
+    def better_than(self, remaining):
+        """Share of simulated deals that ended with more cards than remaining"""
+        return (self.games - self.at_most(remaining)) / self.games
+
+    def close(self):
+        self.map.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the outcome tables the app ships with.')
+    parser.add_argument('--db', default='simulator.db', help='simulator database to read (default: simulator.db)')
+    parser.add_argument('--computer-games', type=int, default=None,
+                        help='build the Computer table by playing this many GameModel games instead')
+    parser.add_argument('--seed', type=int, default=None, help='seed for --computer-games')
+    parser.add_argument('--out', default=None,
+                        help=f'table to write (default: {TABLE_PATH}, or {COMPUTER_TABLE_PATH} '
+                             f'with --computer-games)')
+    args = parser.parse_args()
+
+    if args.computer_games is not None:
+        import random
+        from game_model import play_games
+
+        if args.computer_games < 1:
+            raise SystemExit("--computer-games must be at least 1")
+        out = args.out or COMPUTER_TABLE_PATH
+        games = write_table(play_games(args.computer_games, random.Random(args.seed)), out)
+        print(f"Wrote {out} from {games} Computer games.")
+        raise SystemExit(0)
+
+    from result_store import ResultStore
+
+    args.out = args.out or TABLE_PATH
+    if not os.path.exists(args.db):
+        raise SystemExit(f"No simulator database at {args.db}")
+    store = ResultStore(args.db)
+    try:
+        games = write_table(store.totals(), args.out)
+    except ValueError as e:
+        raise SystemExit(f"{args.db}: {e}")
+    finally:
+        store.close()
+    print(f"Wrote {args.out} from {games} games.")
@@ -0,0 +1,87 @@
+from collections import Counter
+from math import sqrt
+from statistics import NormalDist
+
+from cards import DECK_SIZE
+
+
+class Estimate:
+    """Running win rate and mean cards remaining with confidence intervals.
+
+    Counts are added a round at a time with update(), so checking whether a
+    run is precise enough costs nothing next to playing the round.  Win rates
+    and histogram bins use the Wilson score interval, which stays sensible
+    for rare outcomes; the mean uses the normal approximation.
+    """
+
+    def __init__(self, confidence=0.99, counts=None):
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be between 0 and 1")
+        self.confidence = confidence
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.histogram = Counter()
+        self.games = 0
+        self.total = 0
+        self.total_squares = 0
+        if counts:
+            self.update(counts)
+
+    def update(self, counts):
+        """Add a Counter of cards remaining -> games"""
+        for remaining, games in counts.items():
+            self.histogram[remaining] += games
+            self.games += games
+            self.total += remaining * games
+            self.total_squares += remaining * remaining * games
+
+    def proportion_interval(self, hits):
+        """Return (estimate, low, high) for the share of games counted in hits"""
+        if not self.games:
+            return 0.0, 0.0, 1.0
+        n = self.games
+        p = hits / n
+        z2 = self.z * self.z
+        centre = (p + z2 / (2 * n)) / (1 + z2 / n)
+        half = self.z * sqrt(p * (1 - p) / n + z2 / (4 * n * n)) / (1 + z2 / n)
+        return p, max(0.0, centre - half), min(1.0, centre + half)
+
+    def win_interval(self):
+        return self.proportion_interval(self.histogram[0])
+
+    def mean_interval(self):
+        """Return (mean, low, high) for the cards remaining"""
+        if self.games < 2:
+            return 0.0, 0.0, float(DECK_SIZE)
+        mean = self.total / self.games
+        variance = max(0.0, (self.total_squares - self.games * mean * mean) / (self.games - 1))
+        half = self.z * sqrt(variance / self.games)
+        return mean, mean - half, mean + half
+
+    def met(self, win_tolerance=None, mean_tolerance=None):
+        """True once every given tolerance is at least the interval's half-width"""
+        if win_tolerance is not None:
+            p, low, high = self.win_interval()
+            if (high - low) / 2 > win_tolerance:
+                return False
+        if mean_tolerance is not None:
+            mean, low, high = self.mean_interval()
+            if (high - low) / 2 > mean_tolerance:
+                return False
+        return True
+
+    def summary(self):
+        """One line with the win rate and mean intervals"""
+        p, p_low, p_high = self.win_interval()
+        mean, mean_low, mean_high = self.mean_interval()
+        return (f"{self.games} games: win rate {p:.6%} [{p_low:.6%}, {p_high:.6%}], "
+                f"mean cards remaining {mean:.4f} [{mean_low:.4f}, {mean_high:.4f}] at {self.confidence * 100:g}% confidence")
+
+    def report(self):
+        """The histogram as 'remaining count share low high' lines, then the summary"""
+        lines = []
+        for remaining in range(DECK_SIZE + 1):
+            games = self.histogram[remaining]
+            share, low, high = self.proportion_interval(games)
+            lines.append(f"{remaining} {games} {share:.6f} {low:.6f} {high:.6f}")
+        lines.append(self.summary())
+        return '\n'.join(lines)
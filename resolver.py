@@ -0,0 +1,145 @@
+from cards import DECK_SIZE, RANK_OF, SUIT_OF
+
+RANK_MATCH = 'rank'
+SUIT_MATCH = 'suit'
+
+
+class Resolver:
+    """Deals cards onto a pile one at a time and removes matches as they appear.
+
+    The newest card is compared with the card three places below it.  A rank
+    match removes all four cards and a suit match removes the two between them.
+    Two different cards never share both rank and suit, so at most one of the
+    two can apply and the order they are tried in never changes a game.
+
+    Only the top four cards can ever match, so each card costs amortized O(1)
+    work.  Cards are the ints from cards.py and the pile is a bytearray plus a
+    height, allocated once and reused for every game.
+    """
+
+    def __init__(self, size=DECK_SIZE):
+        self.pile = bytearray(size)
+        self.height = 0
+
+    def __len__(self):
+        return self.height
+
+    def reset(self):
+        self.height = 0
+
+    def cards(self):
+        """Return the pile as a list, bottom card first"""
+        return list(self.pile[:self.height])
+
+    def add(self, card):
+        """Put a card on the pile without resolving anything"""
+        self.pile[self.height] = card
+        self.height += 1
+
+    def find_match(self):
+        """Return RANK_MATCH, SUIT_MATCH or None for the top four cards"""
+        if self.height < 4:
+            return None
+        newest = self.pile[self.height - 1]
+        fourth = self.pile[self.height - 4]
+        if RANK_OF[newest] == RANK_OF[fourth]:
+            return RANK_MATCH
+        if SUIT_OF[newest] == SUIT_OF[fourth]:
+            return SUIT_MATCH
+        return None
+
+    def top_matches_any(self):
+        """True if the top card shares a rank or suit with any card three or more below it"""
+        pile = self.pile
+        newest = pile[self.height - 1]
+        for i in range(self.height - 3):
+            if RANK_OF[pile[i]] == RANK_OF[newest] or SUIT_OF[pile[i]] == SUIT_OF[newest]:
+                return True
+        return False
+
+    def remove(self, match):
+        if match == RANK_MATCH:
+            self.height -= 4
+        elif match == SUIT_MATCH:
+            self.pile[self.height - 3] = self.pile[self.height - 1]
+            self.height -= 2
+
+    def step(self):
+        """Remove a single match from the top of the pile and return it"""
+        match = self.find_match()
+        self.remove(match)
+        return match
+
+    def deal(self, card):
+        """Add a card and remove matches until none are left on top"""
+        self.add(card)
+        while self.step() is not None:
+            pass
+
+    def play_counted(self, deck, stats):
+        """play() that also adds match counts to an instrumentation.new_stats() dict"""
+        rank_matches = suit_matches = backtrack_steps = longest_chain = 0
+        self.reset()
+        for card in deck:
+            self.add(card)
+            chain = 0
+            match = self.step()
+            while match is not None:
+                chain += 1
+                if match == RANK_MATCH:
+                    rank_matches += 1
+                else:
+                    suit_matches += 1
+                match = self.step()
+            if chain:
+                backtrack_steps += chain - 1
+                longest_chain = max(longest_chain, chain)
+        stats['rank_matches'] += rank_matches
+        stats['suit_matches'] += suit_matches
+        stats['backtrack_steps'] += backtrack_steps
+        stats['longest_chain'] = max(stats['longest_chain'], longest_chain)
+        return self.height
+
+    def play_one_check(self, deck, stats):
+        """Play a deck as the graphical game's Computer does and return the cards remaining.
+
+        Each card dealt gets a single Check, so a match uncovered by it waits
+        for the next card; once the deck is empty every match left is made.
+        Match counts are added to an instrumentation.new_stats() dict.
+        """
+        self.reset()
+        for card in deck:
+            self.add(card)
+            match = self.step()
+            if match is not None:
+                stats['rank_matches' if match == RANK_MATCH else 'suit_matches'] += 1
+        match = self.step()
+        while match is not None:
+            stats['rank_matches' if match == RANK_MATCH else 'suit_matches'] += 1
+            match = self.step()
+        return self.height
+
+    def play(self, deck):
+        """Play a whole deck from an empty pile and return the cards remaining"""
+        # Same as deal() for every card, inlined because this is the
+        # simulator's inner loop
+        pile = self.pile
+        rank_of = RANK_OF
+        suit_of = SUIT_OF
+        height = 0
+        for card in deck:
+            pile[height] = card
+            height += 1
+            while height >= 4:
+                fourth = pile[height - 4]
+                if rank_of[card] == rank_of[fourth]:
+                    # The card uncovered was already checked, so no chain
+                    height -= 4
+                    break
+                elif suit_of[card] == suit_of[fourth]:
+                    pile[height - 3] = card
+                    height -= 2
+                else:
+                    break
+        self.height = height
+        return height
@@ -0,0 +1,191 @@
+import os
+import sqlite3
+from collections import Counter
+
+from cards import DECK_SIZE
+
+
+def write_histogram_text(counts, path='solitaire.txt'):
+    """Write a Counter of cards remaining as 'remaining count' lines, replacing path atomically"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as file:
+        for remaining_cards in range(DECK_SIZE + 1):  # 0 to 52 inclusive
+            file.write(f"{remaining_cards} {counts[remaining_cards]}\n")
+    os.replace(temp_path, path)
+
+
+class ResultStore:
+    """Long-lived connection to the simulator's solitare table.
+
+    Each round's counts are added with one executemany upsert inside a single
+    transaction, so the cost of a round does not grow with the number of
+    rounds already stored.  The database is the only source of truth;
+    solitaire.txt is written from it on request by export_text().
+
+    Campaigns are long runs that can be stopped and resumed.  Their settings,
+    progress and own histogram are updated in the same transaction as the
+    totals, so every round is counted exactly once.
+    """
+
+    CAMPAIGN_COLUMNS = ('name', 'seed', 'streams', 'sims_per_run', 'engine',
+                        'target_games', 'rounds_done', 'games_done')
+    SHARD_COLUMNS = ('master_seed', 'seed_start', 'seed_stop', 'games_per_seed', 'games',
+                     'engine', 'engine_version', 'rules')
+
+    def __init__(self, path='simulator.db'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        # WAL lets readers look at the table while a run is writing to it
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.create_tables()
+
+    def create_tables(self):
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS solitare (
+                    Results INTEGER PRIMARY KEY,
+                    Count INTEGER DEFAULT 0
+                )
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS campaigns (
+                    name TEXT PRIMARY KEY,
+                    seed INTEGER,
+                    streams INTEGER,
+                    sims_per_run INTEGER,
+                    engine TEXT,
+                    target_games INTEGER,
+                    rounds_done INTEGER DEFAULT 0,
+                    games_done INTEGER DEFAULT 0
+                )
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS campaign_results (
+                    campaign TEXT,
+                    Results INTEGER,
+                    Count INTEGER DEFAULT 0,
+                    PRIMARY KEY (campaign, Results)
+                )
+            ''')
+            # One row per shard file added to the totals, so merging is idempotent
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS merged_shards (
+                    master_seed INTEGER,
+                    seed_start INTEGER,
+                    seed_stop INTEGER,
+                    games_per_seed INTEGER,
+                    games INTEGER,
+                    engine TEXT,
+                    engine_version INTEGER,
+                    rules TEXT,
+                    PRIMARY KEY (master_seed, seed_start, seed_stop)
+                )
+            ''')
+            # Every possible result (0-52) always has a row
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO solitare (Results, Count) VALUES (?, 0)',
+                [(i,) for i in range(DECK_SIZE + 1)]
+            )
+
+    def add(self, counts, campaign=None, round_number=None):
+        """Add a Counter of cards remaining -> games to the totals in one transaction.
+
+        With a campaign name, round_number must be the campaign's next round;
+        its checkpoint moves past it in the same transaction.
+        """
+        rows = sorted(counts.items())
+        with self.conn:
+            self.conn.executemany(
+                'INSERT INTO solitare (Results, Count) VALUES (?, ?) '
+                'ON CONFLICT(Results) DO UPDATE SET Count = Count + excluded.Count',
+                rows
+            )
+            if campaign is None:
+                return
+            cursor = self.conn.execute(
+                'UPDATE campaigns SET rounds_done = rounds_done + 1, games_done = games_done + ? '
+                'WHERE name = ? AND rounds_done = ?',
+                (sum(counts.values()), campaign, round_number)
+            )
+            if cursor.rowcount != 1:
+                # Another process already saved this round; rolling back
+                # keeps it from being counted twice
+                raise ValueError(f"Campaign {campaign!r} is not at round {round_number}")
+            self.conn.executemany(
+                'INSERT INTO campaign_results (campaign, Results, Count) VALUES (?, ?, ?) '
+                'ON CONFLICT(campaign, Results) DO UPDATE SET Count = Count + excluded.Count',
+                [(campaign, remaining, count) for remaining, count in rows]
+            )
+
+    def merge_shards(self, shards, check=None):
+        """Add shard histograms to the totals in one transaction, skipping shards merged before.
+
+        shards are dicts with the keys in SHARD_COLUMNS and a 'histogram'
+        list.  check, if given, is called as check(shards, merged) with the
+        shards already merged while the database is locked, and may raise to
+        abort.  Returns the shards that were added.
+        """
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            merged = [dict(zip(self.SHARD_COLUMNS, row)) for row in self.conn.execute(
+                f"SELECT {', '.join(self.SHARD_COLUMNS)} FROM merged_shards")]
+            if check is not None:
+                check(shards, merged)
+            added = []
+            for shard in shards:
+                cursor = self.conn.execute(
+                    f"INSERT OR IGNORE INTO merged_shards ({', '.join(self.SHARD_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(self.SHARD_COLUMNS))})",
+                    [shard[column] for column in self.SHARD_COLUMNS]
+                )
+                if cursor.rowcount != 1:
+                    continue
+                self.conn.executemany(
+                    'INSERT INTO solitare (Results, Count) VALUES (?, ?) '
+                    'ON CONFLICT(Results) DO UPDATE SET Count = Count + excluded.Count',
+                    [(remaining, count) for remaining, count in enumerate(shard['histogram']) if count]
+                )
+                added.append(shard)
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+        return added
+
+    def create_campaign(self, campaign):
+        """Save a new campaign from a dict with the keys in CAMPAIGN_COLUMNS"""
+        with self.conn:
+            self.conn.execute(
+                f"INSERT INTO campaigns ({', '.join(self.CAMPAIGN_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(self.CAMPAIGN_COLUMNS))})",
+                [campaign[column] for column in self.CAMPAIGN_COLUMNS]
+            )
+
+    def load_campaign(self, name):
+        """Return a campaign's settings and progress as a dict, or None"""
+        row = self.conn.execute(
+            f"SELECT {', '.join(self.CAMPAIGN_COLUMNS)} FROM campaigns WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(self.CAMPAIGN_COLUMNS, row))
+
+    def campaign_totals(self, name):
+        """Return the histogram of one campaign as a Counter"""
+        rows = self.conn.execute(
+            'SELECT Results, Count FROM campaign_results WHERE campaign = ? AND Count > 0', (name,)
+        )
+        return Counter(dict(rows))
+
+    def totals(self):
+        """Return the stored histogram as a Counter"""
+        rows = self.conn.execute('SELECT Results, Count FROM solitare WHERE Count > 0')
+        return Counter(dict(rows))
+
+    def export_text(self, path='solitaire.txt'):
+        """Write the stored totals as 'remaining count' lines, replacing path atomically"""
+        write_histogram_text(self.totals(), path)
+
+    def close(self):
+        self.conn.close()
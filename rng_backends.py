@@ -0,0 +1,165 @@
+"""Ways of shuffling the simulator's decks.
+
+stdlib   random.Random per stream, one random.shuffle per deck; the original
+         pure-Python path.
+numpy    a numpy Generator per stream that shuffles a whole block of decks at
+         once (batch_engine.deal_batch).
+counter  game k of a stream is computed directly from (seed, k), so any game
+         can be dealt again without playing the ones before it, and streams
+         can be split between workers at any game.  The keys come from
+         Philox4x64-10, a counter-based generator: numpy.random.Philox makes
+         a whole block of games in C, about as fast as the numpy backend.
+         Without numpy the same blocks are computed in pure Python, which
+         gives the same decks but is about ten times slower than stdlib.
+
+A seed is an int or a tuple of ints naming one stream.  The deck of any
+counter game can be printed, e.g. game 123456 of simulator.py --rng counter
+--seed 7:
+
+    python rng_backends.py --seed 7 --game 123456
+"""
+import argparse
+import hashlib
+import random
+
+try:
+    import numpy as np
+except ImportError:  # stdlib and counter still work without numpy
+    np = None
+
+from cards import DECK_SIZE, card_name, new_deck
+
+BACKENDS = ('stdlib', 'numpy', 'counter')
+# Names used for the same streams before the shuffle could be chosen
+LEGACY_NAMES = {'python': 'stdlib', 'batch': 'numpy'}
+
+# A counter game's deck is its 52 cards sorted by 64-bit keys.  Game k of a
+# stream takes outputs 52k .. 52k + 51 of a Philox4x64-10 generator keyed by
+# the stream, so it starts on a block boundary: each block holds four keys.
+# The low bits of each key are replaced by its card, so no two keys are equal
+# and every sort puts them in the same order
+BLOCK_KEYS = 4
+GAME_BLOCKS = DECK_SIZE // BLOCK_KEYS
+CARD_BITS = 6
+HIGH_BITS = ((1 << 64) - 1) ^ ((1 << CARD_BITS) - 1)
+# Games dealt per numpy call when decks are yielded one at a time
+COUNTER_CHUNK = 10000
+CARDS = range(DECK_SIZE)
+
+# Philox4x64-10 constants (Salmon et al., "Parallel random numbers: as easy
+# as 1, 2, 3", SC 2011), as numpy.random.Philox uses them
+PHILOX_M0 = 0xD2E7470EE14C6C93
+PHILOX_M1 = 0xCA5A826395121157
+PHILOX_W0 = 0x9E3779B97F4A7C15
+PHILOX_W1 = 0xBB67AE8584CAA73B
+PHILOX_ROUNDS = 10
+MASK64 = (1 << 64) - 1
+
+
+def default_backend():
+    return 'numpy' if np is not None else 'stdlib'
+
+
+def backend_name(name):
+    """The backend a stored engine name refers to"""
+    return LEGACY_NAMES.get(name, name)
+
+
+def available(backend):
+    return backend in BACKENDS and (backend != 'numpy' or np is not None)
+
+
+def seed_text(seed):
+    return ':'.join(map(str, seed)) if isinstance(seed, tuple) else str(seed)
+
+
+def counter_key(seed):
+    """The two 64-bit words of a stream's Philox key"""
+    digest = hashlib.shake_128(f"{seed_text(seed)}/".encode()).digest(16)
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+
+
+def philox_block(counter, key):
+    """The four 64-bit outputs of Philox4x64-10 for a counter below 2**64"""
+    c0, c1, c2, c3 = counter, 0, 0, 0
+    k0, k1 = key
+    for x in range(PHILOX_ROUNDS):
+        p0 = PHILOX_M0 * c0
+        p1 = PHILOX_M1 * c2
+        c0, c1, c2, c3 = (p1 >> 64) ^ c1 ^ k0, p1 & MASK64, (p0 >> 64) ^ c3 ^ k1, p0 & MASK64
+        k0 = (k0 + PHILOX_W0) & MASK64
+        k1 = (k1 + PHILOX_W1) & MASK64
+    return c0, c1, c2, c3
+
+
+def counter_deck(seed, game):
+    """Deck of one counter game as a bytearray in dealing order"""
+    return next(counter_decks(seed, 1, game))
+
+
+def counter_decks(seed, count, first=0):
+    if np is not None:
+        for start in range(first, first + count, COUNTER_CHUNK):
+            for deck in counter_batch(seed, min(COUNTER_CHUNK, first + count - start), start):
+                yield bytearray(deck.tobytes())
+        return
+    key = counter_key(seed)
+    for game in range(first, first + count):
+        keys = []
+        # numpy's Philox adds one to the counter before each block
+        for block in range(game * GAME_BLOCKS + 1, (game + 1) * GAME_BLOCKS + 1):
+            keys += philox_block(block, key)
+        keys = [raw & HIGH_BITS | card for card, raw in zip(CARDS, keys)]
+        yield bytearray(sorted(CARDS, key=keys.__getitem__))
+
+
+def counter_batch(seed, count, first=0):
+    """counter_decks() as a (count, 52) uint8 array"""
+    generator = np.random.Philox(key=np.array(counter_key(seed), dtype=np.uint64))
+    generator.advance(first * GAME_BLOCKS)
+    keys = generator.random_raw(count * DECK_SIZE).reshape(count, DECK_SIZE)
+    keys &= np.uint64(HIGH_BITS)
+    keys |= np.arange(DECK_SIZE, dtype=np.uint64)
+    return np.argsort(keys, axis=1).astype(np.uint8)
+
+
+def deal_decks(backend, count, seed, first=0):
+    """Yield count decks of a stream as bytearrays, starting at game first.
+
+    Only the counter backend can start part way through a stream.
+    """
+    if first and backend != 'counter':
+        raise ValueError(f"The {backend} backend can only deal a stream from its first game")
+    if backend == 'counter':
+        yield from counter_decks(seed, count, first)
+    elif backend == 'numpy':
+        for deck in deal_batch(backend, count, seed):
+            yield bytearray(deck.tobytes())
+    else:
+        rng = random.Random(seed_text(seed))
+        full_deck = new_deck()
+        for x in range(count):
+            deck = bytearray(full_deck)
+            rng.shuffle(deck)
+            yield deck
+
+
+def deal_batch(backend, count, seed, first=0):
+    """The decks deal_decks() gives, as a (count, 52) uint8 array; needs numpy"""
+    if backend == 'counter':
+        return counter_batch(seed, count, first)
+    if backend == 'numpy':
+        if first:
+            raise ValueError("The numpy backend can only deal a stream from its first game")
+        import batch_engine
+        return batch_engine.deal_batch(count, seed)
+    data = b''.join(deal_decks(backend, count, seed, first))
+    return np.frombuffer(data, dtype=np.uint8).reshape(count, DECK_SIZE)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Print the deck of one counter-backend game.')
+    parser.add_argument('--seed', type=int, required=True, help='master seed of the run')
+    parser.add_argument('--game', type=int, required=True, help='game number, counting from 0')
+    args = parser.parse_args()
+    print(' '.join(card_name(card) for card in counter_deck(args.seed, args.game)))
@@ -0,0 +1,206 @@
+"""Split a simulation into shards by seed range and merge their results.
+
+A shard plays games_per_seed games from each seed index in [start, stop) of
+a master seed, so shards can run anywhere, in any order, and together give
+the same totals as one run over the whole range.  Each shard writes a JSON
+file that says which seeds it played and with which engine:
+
+    python shards.py run --seed 7 --start 0 --stop 100 --out shard-0000.json
+    python shards.py run --seed 7 --start 100 --stop 200 --out shard-0001.json
+    python shards.py merge shard-*.json --db simulator.db --export
+
+Merging checks that the ranges of each master seed start at 0 and neither
+overlap nor leave gaps, and that every shard was played by the same engine
+version and rules.  Merged shards are recorded in the database, so merging a
+file again does nothing.
+"""
+import argparse
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import rng_backends
+import simulator
+from cards import DECK_SIZE
+from result_store import ResultStore
+
+FORMAT = 'lazy-solitaire-shard'
+FORMAT_VERSION = 1
+GAMES_PER_SEED = 10000
+
+
+def run_shard(master_seed, start, stop, games_per_seed=GAMES_PER_SEED, workers=simulator.WORKERS,
+              rng=simulator.DEFAULT_RNG):
+    """Play every seed index in [start, stop) and return the shard as a dict.
+
+    With the counter backend, seed index k is games k * games_per_seed
+    onwards of the master seed's stream, the same games simulator.py --rng
+    counter plays.
+    """
+    results = Counter()
+    indexes = range(start, stop)
+    sizes = [games_per_seed] * len(indexes)
+    if rng == 'counter':
+        seeds = [master_seed] * len(indexes)
+        firsts = [index * games_per_seed for index in indexes]
+    else:
+        seeds = [(master_seed, index) for index in indexes]
+        firsts = [0] * len(indexes)
+    rngs = [rng] * len(indexes)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for counts in executor.map(simulator.simulate_chunk, sizes, seeds, rngs, firsts):
+                results.update(counts)
+    else:
+        for counts in map(simulator.simulate_chunk, sizes, seeds, rngs, firsts):
+            results.update(counts)
+    return {
+        'format': FORMAT,
+        'format_version': FORMAT_VERSION,
+        'master_seed': master_seed,
+        'seed_start': start,
+        'seed_stop': stop,
+        'games_per_seed': games_per_seed,
+        'games': sum(results.values()),
+        'engine': rng,
+        'engine_version': simulator.ENGINE_VERSION,
+        'rules': simulator.RULES,
+        'histogram': [results[remaining] for remaining in range(DECK_SIZE + 1)],
+    }
+
+
+def write_shard(shard, path):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as file:
+        json.dump(shard, file)
+    os.replace(temp_path, path)
+
+
+def read_shard(path):
+    """Load a shard file and check that it is complete and consistent"""
+    with open(path) as file:
+        shard = json.load(file)
+    if shard.get('format') != FORMAT or shard.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a version {FORMAT_VERSION} shard file")
+    missing = [column for column in ResultStore.SHARD_COLUMNS + ('histogram',) if column not in shard]
+    if missing:
+        raise ValueError(f"{path} has no {', '.join(missing)}")
+    if len(shard['histogram']) != DECK_SIZE + 1 or sum(shard['histogram']) != shard['games']:
+        raise ValueError(f"{path}: the histogram does not add up to {shard['games']} games")
+    if shard['games'] != (shard['seed_stop'] - shard['seed_start']) * shard['games_per_seed']:
+        raise ValueError(f"{path}: {shard['games']} games do not cover seeds "
+                         f"{shard['seed_start']}-{shard['seed_stop']}")
+    return shard
+
+
+def describe(shard):
+    return f"seed {shard['master_seed']} [{shard['seed_start']}, {shard['seed_stop']})"
+
+
+def check_shards(shards, merged, allow_gaps=False):
+    """Raise ValueError unless the new and already merged shards fit together.
+
+    A shard that is already merged with the same settings is allowed,
+    because merging it again is skipped.
+    """
+    ranges = {}
+    for shard in merged + shards:
+        shard['engine'] = rng_backends.backend_name(shard['engine'])
+        key = (shard['master_seed'], shard['seed_start'], shard['seed_stop'])
+        if key in ranges:
+            if any(ranges[key][column] != shard[column] for column in ResultStore.SHARD_COLUMNS):
+                raise ValueError(f"Two different shards cover {describe(shard)}")
+            continue
+        ranges[key] = shard
+
+    first = next(iter(ranges.values()), None)
+    by_seed = {}
+    for shard in ranges.values():
+        # The rules and engine version decide the result of a deal, so
+        # shards that differ there measure different games
+        for column in ('rules', 'engine_version'):
+            if shard[column] != first[column]:
+                raise ValueError(f"{describe(shard)} was played with {column} {shard[column]!r}, "
+                                 f"{describe(first)} with {first[column]!r}")
+        by_seed.setdefault(shard['master_seed'], []).append(shard)
+
+    for master_seed, seed_shards in by_seed.items():
+        seed_shards.sort(key=lambda shard: shard['seed_start'])
+        first = seed_shards[0]
+        for column in ('engine', 'games_per_seed'):
+            for shard in seed_shards:
+                # The backends shuffle differently, so a seed index played
+                # by each would not be the same deals
+                if shard[column] != first[column]:
+                    raise ValueError(f"{describe(shard)} was played with {column} {shard[column]!r}, "
+                                     f"{describe(first)} with {first[column]!r}")
+        # Seed indexes start at 0, so the first shard must too
+        gaps = [f"[0, {first['seed_start']})"] if first['seed_start'] > 0 else []
+        for previous, shard in zip(seed_shards, seed_shards[1:]):
+            if shard['seed_start'] < previous['seed_stop']:
+                raise ValueError(f"{describe(shard)} overlaps {describe(previous)}")
+            if shard['seed_start'] > previous['seed_stop']:
+                gaps.append(f"[{previous['seed_stop']}, {shard['seed_start']})")
+        if gaps and not allow_gaps:
+            raise ValueError(f"Seed {master_seed} is missing seed indexes {', '.join(gaps)}")
+
+
+def merge(paths, db='simulator.db', allow_gaps=False):
+    """Merge shard files into the totals and return the shards that were added"""
+    shards = [read_shard(path) for path in paths]
+    store = ResultStore(db)
+    try:
+        return store.merge_shards(shards, lambda new, merged: check_shards(new, merged, allow_gaps))
+    finally:
+        store.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run or merge seed-range shards of a simulation.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='play one shard and write its result file')
+    run.add_argument('--seed', type=int, required=True, help='master seed shared by all shards')
+    run.add_argument('--start', type=int, required=True, help='first seed index of this shard')
+    run.add_argument('--stop', type=int, required=True, help='seed index after the last one')
+    run.add_argument('--games-per-seed', type=int, default=GAMES_PER_SEED,
+                     help=f'games played from each seed index (default: {GAMES_PER_SEED})')
+    run.add_argument('--workers', type=int, default=simulator.WORKERS,
+                     help=f'number of worker processes (default: {simulator.WORKERS})')
+    run.add_argument('--rng', choices=rng_backends.BACKENDS, default=simulator.DEFAULT_RNG,
+                     help=f'how decks are shuffled (default: {simulator.DEFAULT_RNG})')
+    run.add_argument('--out', required=True, help='path of the shard file to write')
+
+    merge_command = commands.add_parser('merge', help='add shard files to the totals in the database')
+    merge_command.add_argument('paths', nargs='+', metavar='SHARD')
+    merge_command.add_argument('--db', default='simulator.db',
+                               help='sqlite database that holds the totals (default: simulator.db)')
+    merge_command.add_argument('--allow-gaps', action='store_true',
+                               help='merge even if seed indexes before or between the shards are missing')
+    merge_command.add_argument('--export', nargs='?', const='solitaire.txt', default=None, metavar='PATH',
+                               help='also write the totals as text (default path: solitaire.txt)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.command == 'run':
+        if not 0 <= args.start < args.stop:
+            raise SystemExit("--start must be at least 0 and less than --stop")
+        if not rng_backends.available(args.rng):
+            raise SystemExit(f"The {args.rng} shuffle needs numpy")
+        shard = run_shard(args.seed, args.start, args.stop, args.games_per_seed, args.workers, args.rng)
+        write_shard(shard, args.out)
+        print(f"Wrote {shard['games']} games from {describe(shard)} to {args.out}.")
+    else:
+        try:
+            added = merge(args.paths, args.db, args.allow_gaps)
+        except (OSError, ValueError) as error:
+            raise SystemExit(f"Nothing merged: {error}")
+        print(f"Merged {len(added)} of {len(args.paths)} shards, "
+              f"{sum(shard['games'] for shard in added)} games.")
+        if args.export:
+            store = ResultStore(args.db)
+            store.export_text(args.export)
+            store.close()
@@ -0,0 +1,179 @@
+"""Importable, streaming interface to the simulator.
+
+No database or file is opened until a sink is created.  Games are played a batch at a
+time and handed on, so memory stays bounded by the batch size however many
+games are asked for:
+
+    import simulation
+
+    for remaining in simulation.outcomes(1000, seed=7):
+        ...
+    for counts in simulation.histograms(10 ** 8, seed=7, rng='counter'):
+        ...
+    totals = simulation.run(10 ** 7, 7, [simulation.SqliteSink('simulator.db'),
+                                         simulation.MemmapSink('outcomes')])
+
+With the same seed, backend and batch size, the games are the ones
+simulator.py --workers 1 --sims-per-run BATCH_SIZE plays.  The same from
+the command line:
+
+    python simulation.py --games 1000000 --seed 7 --db simulator.db --text solitaire.txt
+"""
+import argparse
+from collections import Counter
+
+import rng_backends
+import simulator
+from outcome_columns import COLUMNS, OutcomeWriter
+from result_store import ResultStore, write_histogram_text
+
+
+def batches(count, seed, rng=simulator.DEFAULT_RNG, rules=simulator.RULES,
+            batch_size=simulator.SIMS_PER_RUN, games=True):
+    """Yield (Counter of cards remaining, games) for each batch of up to batch_size games.
+
+    games is simulator.simulate_chunk_games()'s dict of per-game columns, or
+    None when games=False, which is faster with the default rules.
+    """
+    if rules not in simulator.RULE_VARIANTS:
+        raise ValueError(f"Unknown rules {rules!r}, expected one of {', '.join(simulator.RULE_VARIANTS)}")
+    if not rng_backends.available(rng):
+        raise ValueError(f"The {rng} shuffle needs numpy")
+    for number, first in enumerate(range(0, count, batch_size)):
+        size = min(batch_size, count - first)
+        # The streams simulator.play_round() gives a single worker
+        if rng == 'counter':
+            stream, start = seed, first
+        else:
+            stream, start = (seed, number, 0), 0
+        if games or rules != simulator.RULES:
+            counts, chunk = simulator.simulate_chunk_games(size, stream, rng=rng, first=start, rules=rules)
+            yield counts, chunk if games else None
+        else:
+            yield simulator.simulate_chunk(size, stream, rng, start), None
+
+
+def histograms(count, seed, **options):
+    """Yield a Counter of cards remaining per batch; options are those of batches()"""
+    for counts, games in batches(count, seed, games=False, **options):
+        yield counts
+
+
+def outcomes(count, seed, **options):
+    """Yield the cards remaining of every game in turn; options are those of batches()"""
+    for counts, games in batches(count, seed, **options):
+        yield from games['remaining']
+
+
+class MemorySink:
+    """Keeps the running totals in a Counter"""
+    needs_games = False
+
+    def __init__(self):
+        self.totals = Counter()
+
+    def add(self, counts, games):
+        self.totals.update(counts)
+
+    def close(self):
+        pass
+
+
+class TextSink(MemorySink):
+    """Writes the totals as 'remaining count' lines when closed"""
+
+    def __init__(self, path='solitaire.txt'):
+        super().__init__()
+        self.path = path
+
+    def close(self):
+        write_histogram_text(self.totals, self.path)
+
+
+class SqliteSink:
+    """Adds every batch to the totals in a simulator database"""
+    needs_games = False
+
+    def __init__(self, path='simulator.db'):
+        self.store = ResultStore(path)
+
+    def add(self, counts, games):
+        self.store.add(counts)
+
+    def close(self):
+        self.store.close()
+
+
+class MemmapSink:
+    """Appends every game to outcome_columns files that numpy can memory-map"""
+    needs_games = True
+
+    def __init__(self, directory, columns=('remaining',)):
+        self.writer = OutcomeWriter(directory, columns)
+
+    def add(self, counts, games):
+        self.writer.append(games)
+
+    def close(self):
+        self.writer.close()
+
+
+def run(count, seed, sinks, **options):
+    """Play count games into every sink, close them, and return the totals.
+
+    options are those of batches().  The sinks are closed even if a batch
+    fails, so what was added up to then is kept.
+    """
+    totals = Counter()
+    try:
+        needs_games = any(sink.needs_games for sink in sinks)
+        for counts, games in batches(count, seed, games=needs_games, **options):
+            for sink in sinks:
+                sink.add(counts, games)
+            totals.update(counts)
+    finally:
+        for sink in sinks:
+            sink.close()
+    return totals
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Play Lazy Solitaire games into one or more sinks.')
+    parser.add_argument('--games', type=int, required=True)
+    parser.add_argument('--seed', type=int, required=True)
+    parser.add_argument('--rng', choices=rng_backends.BACKENDS, default=simulator.DEFAULT_RNG,
+                        help=f'how decks are shuffled (default: {simulator.DEFAULT_RNG})')
+    parser.add_argument('--rules', choices=simulator.RULE_VARIANTS, default=simulator.RULES,
+                        help=f'{simulator.RULES} makes every match as it appears, one-check presses Check '
+                             f'once per card dealt like the game\'s Computer (default: {simulator.RULES})')
+    parser.add_argument('--batch-size', type=int, default=simulator.SIMS_PER_RUN,
+                        help=f'games held in memory at once (default: {simulator.SIMS_PER_RUN})')
+    parser.add_argument('--db', default=None, help='add the totals to this simulator database')
+    parser.add_argument('--text', default=None, help="write the totals as 'remaining count' lines")
+    parser.add_argument('--outcomes', metavar='DIR', default=None,
+                        help='append every game to memory-mappable column files in DIR')
+    parser.add_argument('--outcome-matches', action='store_true',
+                        help='with --outcomes, also keep per-game rank and suit match counts')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.games < 1 or args.batch_size < 1:
+        raise SystemExit("--games and --batch-size must be at least 1")
+    if not rng_backends.available(args.rng):
+        raise SystemExit(f"The {args.rng} shuffle needs numpy")
+    sinks = []
+    if args.db:
+        sinks.append(SqliteSink(args.db))
+    if args.text:
+        sinks.append(TextSink(args.text))
+    if args.outcomes:
+        try:
+            sinks.append(MemmapSink(args.outcomes, COLUMNS if args.outcome_matches else ('remaining',)))
+        except ValueError as e:
+            raise SystemExit(str(e))
+    totals = run(args.games, args.seed, sinks, rng=args.rng, rules=args.rules, batch_size=args.batch_size)
+    games = sum(totals.values())
+    print(f"Played {games} games: {totals[0]} won, "
+          f"{sum(remaining * n for remaining, n in totals.items()) / games:.3f} cards left on average.")
@@ -1,29 +1,81 @@
+import argparse
+import os
 import random
-import sqlite3
+import secrets
+import signal
 from collections import Counter
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+from cards import RANK_OF, SUIT_OF, new_deck, pack_deck
+from deal_archive import DealArchive
+from instrumentation import StatsWriter, merge_stats, new_stats
+from outcome_columns import OutcomeWriter
+from precision import Estimate
+import rng_backends
+from resolver import Resolver
+from result_store import ResultStore
+
+try:
+    import batch_engine
+except ImportError:  # numpy is optional, fall back to one deal at a time
+    batch_engine = None
+
 
 MAXRUNS = 5
 SIMS_PER_RUN = 50000
-
-origArray = [[1, 1], [1, 2], [1, 3], [1, 4], [2, 1], [2, 2], [2, 3], [2, 4], [3, 1], [3, 2], [3, 3], [3, 4],
-             [4, 1], [4, 2], [4, 3], [4, 4], [5, 1], [5, 2], [5, 3], [5, 4], [6, 1], [6, 2], [6, 3], [6, 4], [7, 1],
-             [7, 2], [7, 3], [7, 4],
-             [8, 1], [8, 2], [8, 3], [8, 4], [9, 1], [9, 2], [9, 3], [9, 4], [10, 1], [10, 2], [10, 3], [10, 4],
-             [11, 1], [11, 2], [11, 3], [11, 4], [12, 1], [12, 2], [12, 3], [12, 4], [13, 1], [13, 2], [13, 3],
-             [13, 4], ]
+WORKERS = os.cpu_count() or 1
+# Bump when the same seed would deal or score different games
+ENGINE_VERSION = 2
+# Every match is made as soon as it appears.  'one-check' is the graphical
+# game's Computer, which presses Check once per card dealt
+RULES = 'rank-first'
+RULE_VARIANTS = (RULES, 'one-check')
+# Shuffle used unless --rng picks another; see rng_backends.py
+DEFAULT_RNG = rng_backends.default_backend()
 
 dealt = ['']
 
+resolver = Resolver()
+
+# jit_engine compiles (or loads) its kernel and self-tests on import, so it
+# is only imported once an engine is needed; None until then
+_jit_engine = None
+
+
+def load_jit_engine():
+    """The jit_engine module, or False if numba is missing or its self-test failed"""
+    global _jit_engine
+    if _jit_engine is None:
+        try:
+            import jit_engine
+            _jit_engine = jit_engine
+        except ImportError:  # numba is optional too, and a failed self-test also lands here
+            _jit_engine = False
+    return _jit_engine
 
-def deal():
-    random.shuffle(dealt)
+
+def array_engine():
+    """The engine that resolves whole arrays of decks, or None without numpy.
+
+    jit_engine when it loads, else batch_engine; both give the same results.
+    """
+    return load_jit_engine() or batch_engine
+
+
+def deal(rng=random):
+    rng.shuffle(dealt)
 
 
 def check():
+    return resolver.play(dealt)
+
+
+def check_by_deletion():
+    """The original list-deleting check(), kept as the reference for verify()"""
     i = 3
     while i <= len(dealt) - 1:
-        if origArray[dealt[i]][0] == origArray[dealt[i - 3]][0]:
+        if RANK_OF[dealt[i]] == RANK_OF[dealt[i - 3]]:
             del dealt[i - 3]
             del dealt[i - 3]
             del dealt[i - 3]
@@ -32,7 +84,7 @@ def check():
                 i = 3
             else:
                 i -= 4
-        elif origArray[dealt[i]][1] == origArray[dealt[i-3]][1]:
+        elif SUIT_OF[dealt[i]] == SUIT_OF[dealt[i-3]]:
             del dealt[i - 2]
             del dealt[i - 2]
             if i - 2 < 3:
@@ -43,86 +95,366 @@ def check():
             i += 1
     return len(dealt)
 
-def init_database():
-    """Initialize the SQLite database and create necessary table if it doesn't exist"""
-    conn = sqlite3.connect('simulator.db')
-    cursor = conn.cursor()
-    
-    # Create the results table if it doesn't exist
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS solitare (
-            Results INTEGER PRIMARY KEY,
-            Count INTEGER DEFAULT 0
-        )
-    ''')
-    
-    # Initialize all possible results (0-52) if table is empty
-    cursor.execute('SELECT COUNT(*) FROM solitare')
-    if cursor.fetchone()[0] == 0:
-        cursor.executemany(
-            'INSERT INTO solitare (Results, Count) VALUES (?, 0)',
-            [(i,) for i in range(53)]
-        )
-    
-    conn.commit()
-    conn.close()
-
-def updateDB(results):
-    try:
-        resultsRemaining = list(Counter(results).keys())
-        resultsCount = list(Counter(results).values())
-
-        conn = sqlite3.connect('simulator.db')
-        cursor = conn.cursor()
-
-        # Update counts for each result
-        for remaining, count in zip(resultsRemaining, resultsCount):
-            cursor.execute(
-                "UPDATE solitare SET Count = Count + ? WHERE Results = ?", 
-                (count, remaining)
-            )
-
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        print(f"Database error: {e}")
-        return
-
-
-init_database()
-
-total = 0
-while total < MAXRUNS:
-    results = []
-    for x in range(SIMS_PER_RUN):
-        dealt = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26,
-                 27, 28, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40, 41, 42, 43, 44, 45, 46, 47, 48, 49, 50, 51, ]
-        deal()
-        results.append(check())
-
-    # Read existing results
-    existing_stats = Counter()
-    try:
-        with open("solitaire.txt", "r") as file:
-            for line in file:
-                remaining_cards, count = map(int, line.strip().split())
-                existing_stats[remaining_cards] = count
-    except FileNotFoundError:
-        pass  # File doesn't exist yet, start with empty counter
-
-    # Update statistics with new results
-    new_stats = Counter(results)
-    combined_stats = existing_stats + new_stats
-
-    # Write updated results back to file
-    with open("solitaire.txt", "w") as file:
-        for remaining_cards in range(53):  # 0 to 52 inclusive
-            if remaining_cards in combined_stats:
-                file.write(f"{remaining_cards} {combined_stats[remaining_cards]}\n")
-            else:
-                file.write(f"{remaining_cards} 0\n")
+def verify(count, seed=0):
+    """Compare every engine against check_by_deletion() on count random decks.
+
+    Returns the number of decks where an engine disagreed.
+    """
+    global dealt
+    rng = random.Random(seed)
+    deck = new_deck()
+    mismatches = 0
+    for start in range(0, count, SIMS_PER_RUN):
+        decks = []
+        expected = []
+        for x in range(min(SIMS_PER_RUN, count - start)):
+            rng.shuffle(deck)
+            decks.append(deck[:])
+            dealt = list(deck)
+            expected.append(check_by_deletion())
+
+        engines = {'resolver': [resolver.play(d) for d in decks]}
+        if batch_engine is not None:
+            engines['batch_engine'] = batch_engine.check_batch(decks).tolist()
+        if load_jit_engine():
+            engines['jit_engine'] = load_jit_engine().check_batch(decks).tolist()
+        for name, results in engines.items():
+            bad = sum(a != b for a, b in zip(results, expected))
+            if bad:
+                print(f"{name} disagreed with check() on {bad} decks")
+            mismatches += bad
+        print(f"Verified {start + len(decks)} decks.")
+    return mismatches
+
+
+def simulate_chunk(count, seed, rng=DEFAULT_RNG, first=0):
+    """Play count games from one RNG stream and return a Counter of cards remaining.
+
+    seed names the stream, normally a (master seed, round, worker) tuple, so
+    every worker in every round gets its own independent stream and re-running
+    it gives the same games.  rng is an rng_backends backend; the counter
+    backend can start at game first of its stream.
+    """
+    global dealt
+    engine = array_engine()
+    if engine is not None:
+        remaining = engine.check_batch(rng_backends.deal_batch(rng, count, seed, first))
+        return histogram_counter(remaining)
+
+    results = Counter()
+    for dealt in rng_backends.deal_decks(rng, count, seed, first):
+        results[check()] += 1
+    return results
+
+
+def simulate_chunk_instrumented(count, seed, rng=DEFAULT_RNG, first=0):
+    """simulate_chunk() that also returns match counts and shuffle/resolve times.
+
+    Kept separate so the uninstrumented path pays nothing for it.  The games
+    played are the same as simulate_chunk() for the same seed.
+    """
+    global dealt
+    stats = new_stats()
+    stats['games'] = count
+    engine = array_engine()
+    if engine is not None:
+        start = perf_counter()
+        decks = rng_backends.deal_batch(rng, count, seed, first)
+        dealt_at = perf_counter()
+        remaining = engine.check_batch(decks, stats)
+        stats['shuffle_seconds'] = dealt_at - start
+        stats['resolve_seconds'] = perf_counter() - dealt_at
+        return histogram_counter(remaining), stats
+
+    results = Counter()
+    decks = rng_backends.deal_decks(rng, count, seed, first)
+    for x in range(count):
+        start = perf_counter()
+        dealt = next(decks)
+        dealt_at = perf_counter()
+        results[resolver.play_counted(dealt, stats)] += 1
+        stats['shuffle_seconds'] += dealt_at - start
+        stats['resolve_seconds'] += perf_counter() - dealt_at
+    return results, stats
+
+
+def simulate_chunk_games(count, seed, packed=False, rng=DEFAULT_RNG, first=0, rules=RULES):
+    """simulate_chunk() that also returns the outcome of every game.
+
+    Returns (Counter, games), where games maps 'remaining', 'rank_matches'
+    and 'suit_matches' to bytes with one uint8 per game and, if packed,
+    'decks' to a list of cards.pack_deck() encodings.  The games played are
+    the same as simulate_chunk() for the same seed.  rules can also be
+    'one-check', which plays them as GameModel.play_autoplay() does, with
+    the pure-Python resolver only.
+    """
+    engine = array_engine() if rules == RULES else None
+    if engine is not None:
+        decks = rng_backends.deal_batch(rng, count, seed, first)
+        remaining, match_counts = engine.check_batch_matches(decks)
+        games = {
+            'remaining': remaining.astype('u1').tobytes(),
+            'rank_matches': match_counts[:, 0].tobytes(),
+            'suit_matches': match_counts[:, 1].tobytes(),
+        }
+        if packed:
+            games['decks'] = batch_engine.pack_batch(decks)
+        return histogram_counter(remaining), games
+
+    game_resolver = Resolver()
+    play_counted = game_resolver.play_one_check if rules == 'one-check' else game_resolver.play_counted
+    results = Counter()
+    games = {'remaining': bytearray(), 'rank_matches': bytearray(), 'suit_matches': bytearray()}
+    if packed:
+        games['decks'] = []
+    for deck in rng_backends.deal_decks(rng, count, seed, first):
+        stats = new_stats()
+        remaining = play_counted(deck, stats)
+        results[remaining] += 1
+        games['remaining'].append(remaining)
+        games['rank_matches'].append(stats['rank_matches'])
+        games['suit_matches'].append(stats['suit_matches'])
+        if packed:
+            games['decks'].append(pack_deck(deck))
+    return results, games
+
+
+def histogram_counter(remaining):
+    histogram = batch_engine.histogram(remaining)
+    return Counter({cards: int(n) for cards, n in enumerate(histogram) if n})
+
+
+def play_round(round_number, seed, workers, games=SIMS_PER_RUN, executor=None, stats=None,
+               per_game=None, packed=False, rng=DEFAULT_RNG, first_game=0):
+    """Split a round's games across workers and merge their counts.
+
+    If stats is a new_stats() dict, the workers are instrumented and their
+    counters are merged into it.  If per_game is a dict, it is filled with
+    every game's outcome as simulate_chunk_games() returns it instead, in
+    worker order.
+
+    Each worker plays its own stream, except with the counter backend: there
+    the whole run is one stream of the master seed, first_game is the number
+    of games played before this round, and the totals do not depend on the
+    number of workers.
+    """
+    share, extra = divmod(games, workers)
+    sizes = [share + (worker < extra) for worker in range(workers)]
+    if rng == 'counter':
+        seeds = [seed] * workers
+        firsts = [first_game + sum(sizes[:worker]) for worker in range(workers)]
+    else:
+        seeds = [(seed, round_number, worker) for worker in range(workers)]
+        firsts = [0] * workers
+    rngs = [rng] * workers
+
+    # With one worker run in-process, the results are the same either way
+    mapper = executor.map if executor is not None else map
+    results = Counter()
+    if per_game is not None:
+        for counts, chunk in mapper(simulate_chunk_games, sizes, seeds, [packed] * workers, rngs, firsts):
+            results.update(counts)
+            for name, values in chunk.items():
+                per_game.setdefault(name, [] if name == 'decks' else bytearray()).extend(values)
+        return results
+    if stats is None:
+        for counts in mapper(simulate_chunk, sizes, seeds, rngs, firsts):
+            results.update(counts)
+        return results
+
+    for counts, worker_stats in mapper(simulate_chunk_instrumented, sizes, seeds, rngs, firsts):
+        results.update(counts)
+        merge_stats(stats, worker_stats)
+    return results
+
+
+def ignore_signals():
+    """Pool initializer: leave SIGINT/SIGTERM to the parent so a round can finish"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Simulate a large number of Lazy Solitaire games.')
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help=f'number of worker processes (default: {WORKERS})')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='master seed; the same seed and worker count give the same totals')
+    parser.add_argument('--games', type=int, default=None,
+                        help=f'number of games to play (default: {MAXRUNS * SIMS_PER_RUN}, '
+                             'or no limit when a tolerance is given)')
+    parser.add_argument('--sims-per-run', type=int, default=SIMS_PER_RUN,
+                        help=f'games per round; totals are saved after every round (default: {SIMS_PER_RUN})')
+    parser.add_argument('--campaign', metavar='NAME', default=None,
+                        help='start a named campaign whose progress is checkpointed in the database')
+    parser.add_argument('--resume', metavar='NAME', default=None,
+                        help='continue a campaign from its last completed round')
+    parser.add_argument('--db', default='simulator.db',
+                        help='sqlite database that holds the totals (default: simulator.db)')
+    parser.add_argument('--export', nargs='?', const='solitaire.txt', default=None, metavar='PATH',
+                        help='also write the totals as text when the run ends (default path: solitaire.txt)')
+    parser.add_argument('--stats', metavar='PATH', default=None,
+                        help='record match counts and shuffle/resolve/persist times for every round '
+                             'as JSON lines, or CSV if PATH ends in .csv')
+    parser.add_argument('--archive', metavar='PATH', default=None,
+                        help='also store every deal with its result in this deal archive database')
+    parser.add_argument('--outcomes', metavar='DIR', default=None,
+                        help='append every game\'s cards remaining to memory-mappable uint8 column files in DIR')
+    parser.add_argument('--outcome-matches', action='store_true',
+                        help='with --outcomes, also keep per-game rank and suit match counts')
+    parser.add_argument('--win-tolerance', type=float, default=None, metavar='RATE',
+                        help='stop once the win rate is known to within this, e.g. 0.0001 for 0.01%%')
+    parser.add_argument('--mean-tolerance', type=float, default=None, metavar='CARDS',
+                        help='stop once the mean cards remaining is known to within this')
+    parser.add_argument('--confidence', type=float, default=0.99,
+                        help='confidence level for the tolerances and the reported intervals (default: 0.99)')
+    parser.add_argument('--rng', choices=rng_backends.BACKENDS, default=None,
+                        help=f'how decks are shuffled (default: {DEFAULT_RNG}); counter makes every game '
+                             'replayable on its own with rng_backends.py')
+    parser.add_argument('--verify', type=int, metavar='DECKS', default=None,
+                        help='check every engine against the original check() on this many decks and exit')
+    return parser.parse_args()
+
+
+def precision_mode(args):
+    return args.win_tolerance is not None or args.mean_tolerance is not None
+
+
+def load_campaign(store, args):
+    """Return the settings for this run, creating or resuming a campaign if asked"""
+    if args.resume:
+        campaign = store.load_campaign(args.resume)
+        if campaign is None:
+            raise SystemExit(f"No campaign named {args.resume!r} in {args.db}")
+        # Every backend deals different games from the same seed, so a
+        # campaign keeps the one it started with
+        campaign['engine'] = rng_backends.backend_name(campaign['engine'])
+        if args.rng is not None and args.rng != campaign['engine']:
+            raise SystemExit(f"Campaign {args.resume!r} was started with the {campaign['engine']} shuffle, "
+                             f"not {args.rng}")
+        if not rng_backends.available(campaign['engine']):
+            raise SystemExit(f"Campaign {args.resume!r} needs the {campaign['engine']} shuffle, "
+                             "which needs numpy")
+        if args.games is not None:
+            campaign['target_games'] = args.games
+        if campaign['target_games'] is None and not precision_mode(args):
+            raise SystemExit(f"Campaign {args.resume!r} has no game limit, resume it with a tolerance or --games")
+        return campaign
+
+    engine = args.rng or DEFAULT_RNG
+    if not rng_backends.available(engine):
+        raise SystemExit(f"The {engine} shuffle needs numpy")
+    seed = args.seed if args.seed is not None else secrets.randbits(63)
+    target_games = args.games
+    if target_games is None and not precision_mode(args):
+        target_games = MAXRUNS * SIMS_PER_RUN
+    campaign = {
+        'name': args.campaign,
+        'seed': seed,
+        'streams': args.workers,
+        'sims_per_run': args.sims_per_run,
+        'engine': engine,
+        'target_games': target_games,
+        'rounds_done': 0,
+        'games_done': 0,
+    }
+    if args.campaign:
+        if store.load_campaign(args.campaign) is not None:
+            raise SystemExit(f"Campaign {args.campaign!r} already exists, use --resume to continue it")
+        store.create_campaign(campaign)
+    return campaign
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.verify is not None:
+        raise SystemExit(1 if verify(args.verify, args.seed or 0) else 0)
+    if (args.archive or args.outcomes) and args.stats:
+        raise SystemExit("--archive and --outcomes cannot be used with --stats")
+
+    store = ResultStore(args.db)
+    campaign = load_campaign(store, args)
+    engine = array_engine()
+    resolver_name = engine.__name__ if engine is not None else 'resolver'
+    print(f"Master seed: {campaign['seed']} ({campaign['engine']} shuffle, {resolver_name})")
+
+    # Finish the current round on SIGTERM/SIGINT instead of losing it
+    stop_requested = []
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda signum, frame: stop_requested.append(signum))
 
-    updateDB(results)
-    total += 1
-    print(f"Simulation round number {total} completed.")
-print(f"Completed {total * SIMS_PER_RUN} simulations.")
\ No newline at end of file
+    executor = None
+    if args.workers > 1:
+        executor = ProcessPoolExecutor(max_workers=args.workers, initializer=ignore_signals)
+    stats_writer = StatsWriter(args.stats) if args.stats else None
+    archive = DealArchive(args.archive) if args.archive else None
+    outcomes = None
+    if args.outcomes:
+        columns = ('remaining', 'rank_matches', 'suit_matches') if args.outcome_matches else ('remaining',)
+        try:
+            outcomes = OutcomeWriter(args.outcomes, columns, campaign['name'], campaign['games_done'])
+        except ValueError as e:
+            raise SystemExit(str(e))
+    round_number = campaign['rounds_done']
+    total = campaign['games_done']
+    target = campaign['target_games']
+    # A campaign's intervals cover every round it has played, not just this run's
+    estimate = Estimate(args.confidence, store.campaign_totals(campaign['name']) if campaign['name'] else None)
+    precise = False
+    while (target is None or total < target) and not stop_requested and not precise:
+        games = campaign['sims_per_run'] if target is None else min(campaign['sims_per_run'], target - total)
+        round_stats = new_stats() if stats_writer is not None else None
+        per_game = {} if archive is not None or outcomes is not None else None
+        start = perf_counter()
+        results = play_round(round_number, campaign['seed'], campaign['streams'], games, executor,
+                             round_stats, per_game, packed=archive is not None,
+                             rng=campaign['engine'], first_game=total)
+        persist_start = perf_counter()
+        # Per-game data is written first: a crash before the totals are saved
+        # replays the round on resume, and both skip or cut what they had of it
+        if archive is not None:
+            archive.add(list(zip(per_game['decks'], per_game['remaining'],
+                                 per_game['rank_matches'], per_game['suit_matches'])),
+                        campaign['name'], round_number)
+        if outcomes is not None:
+            outcomes.append(per_game)
+        try:
+            # The checkpoint is written in the same transaction as the totals,
+            # so a round is either fully counted or replayed on resume
+            store.add(results, campaign['name'], round_number)
+        except Exception as e:
+            print(f"Database error: {e}")
+            raise
+        if stats_writer is not None:
+            round_stats.update(campaign=campaign['name'], round=round_number,
+                               persist_seconds=perf_counter() - persist_start,
+                               wall_seconds=perf_counter() - start)
+            stats_writer.write(round_stats)
+        round_number += 1
+        total += games
+        print(f"Simulation round number {round_number} completed.")
+        if precision_mode(args):
+            estimate.update(results)
+            precise = estimate.met(args.win_tolerance, args.mean_tolerance)
+            print(estimate.summary())
+    if executor is not None:
+        executor.shutdown()
+    if args.export:
+        store.export_text(args.export)
+    if stats_writer is not None:
+        stats_writer.close()
+    if archive is not None:
+        archive.close()
+    if outcomes is not None:
+        outcomes.close()
+    store.close()
+    if precision_mode(args):
+        print(estimate.report())
+    if precise:
+        print(f"Reached the requested precision after {total} simulations.")
+    elif stop_requested and (target is None or total < target):
+        print(f"Stopped after {total} of {target or 'unlimited'} simulations.")
+        if campaign['name']:
+            print(f"Continue with: simulator.py --resume {campaign['name']}")
+    else:
+        print(f"Completed {total} simulations.")
@@ -0,0 +1,58 @@
+"""Startup phase timing for the app, logged as one JSON line per launch.
+
+main.py imports this module before anything else.  Each phase records its
+own duration in seconds:
+
+    import       loading Kivy and the game modules
+    window       creating the window
+    first_frame  building the widgets until the first frame is on screen
+    db           opening the results database, done after the first frame
+    assets       decoding the card images, spread over idle frames
+
+plus to_first_frame, the time from the start of the import until the first
+frame.  Once every phase is in, a line such as
+
+    Startup: {"version": "1.0.3", "import": 0.412, ...}
+
+is printed (adb logcat shows it on Android) and, if SOLITAIRE_STARTUP_LOG
+names a file, appended to it, so releases can be compared line by line.
+"""
+import json
+import os
+from time import perf_counter
+
+PHASES = ('import', 'window', 'first_frame', 'db', 'assets')
+
+_started = perf_counter()
+_last_mark = _started
+_times = {}
+_logged = False
+version = None
+
+
+def mark(phase):
+    """Record a phase that ran from the previous mark until now"""
+    global _last_mark
+    now = perf_counter()
+    record(phase, now - _last_mark)
+    _last_mark = now
+    if phase == 'first_frame':
+        record('to_first_frame', now - _started)
+
+
+def record(phase, seconds):
+    """Record a phase timed by the caller"""
+    _times[phase] = round(seconds, 4)
+    if not _logged and all(name in _times for name in PHASES):
+        log()
+
+
+def log():
+    global _logged
+    _logged = True
+    line = json.dumps(dict(version=version, **_times))
+    print(f"Startup: {line}")
+    path = os.environ.get('SOLITAIRE_STARTUP_LOG')
+    if path:
+        with open(path, 'a') as file:
+            file.write(line + '\n')
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+from collections import Counter
+
+import pytest
+
+from result_store import ResultStore
+
+SIMULATOR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'simulator.py')
+
+
+def simulate(db, *args):
+    subprocess.run([sys.executable, SIMULATOR, '--db', db, '--workers', '1', '--rng', 'stdlib',
+                    '--sims-per-run', '1000', *args], check=True, capture_output=True)
+
+
+def test_resumed_campaign_plays_the_same_games(tmp_path):
+    db = str(tmp_path / 'simulator.db')
+    simulate(db, '--campaign', 'whole', '--seed', '5', '--games', '3000')
+    simulate(db, '--campaign', 'stopped', '--seed', '5', '--games', '2000')
+    simulate(db, '--resume', 'stopped', '--games', '3000')
+
+    store = ResultStore(db)
+    try:
+        stopped = store.load_campaign('stopped')
+        assert (stopped['rounds_done'], stopped['games_done']) == (3, 3000)
+        assert store.campaign_totals('stopped') == store.campaign_totals('whole')
+        assert sum(store.totals().values()) == 6000
+    finally:
+        store.close()
+
+
+def test_a_round_is_saved_only_once(tmp_path):
+    store = ResultStore(str(tmp_path / 'simulator.db'))
+    try:
+        store.create_campaign({'name': 'c', 'seed': 1, 'streams': 1, 'sims_per_run': 10, 'engine': 'stdlib',
+                               'target_games': 20, 'rounds_done': 0, 'games_done': 0})
+        store.add(Counter({40: 10}), 'c', 0)
+        with pytest.raises(ValueError):
+            store.add(Counter({40: 10}), 'c', 0)
+        assert store.totals() == Counter({40: 10})
+        assert store.load_campaign('c')['rounds_done'] == 1
+    finally:
+        store.close()
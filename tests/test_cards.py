@@ -0,0 +1,24 @@
+import math
+import random
+
+from cards import DECK_SIZE, PACKED_DECK_SIZE, new_deck, pack_deck, unpack_deck
+
+
+def test_pack_deck_round_trips():
+    rng = random.Random(0)
+    deck = new_deck()
+    for x in range(1000):
+        rng.shuffle(deck)
+        data = pack_deck(deck)
+        assert len(data) == PACKED_DECK_SIZE
+        assert unpack_deck(data) == deck
+
+
+def test_pack_deck_ends_of_the_range():
+    # The sorted deck is permutation 0 and the reversed deck the last one
+    assert pack_deck(new_deck()) == bytes(PACKED_DECK_SIZE)
+    last = new_deck()
+    last.reverse()
+    assert int.from_bytes(pack_deck(last), 'big') == math.factorial(DECK_SIZE) - 1
+    assert unpack_deck(pack_deck(last)) == last
+
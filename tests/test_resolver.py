@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+import simulator
+from cards import new_deck
+from instrumentation import new_stats
+from resolver import Resolver
+
+SEEDS = range(5)
+DECKS_PER_SEED = 400
+
+
+def random_decks(seed, count=DECKS_PER_SEED):
+    rng = random.Random(seed)
+    deck = new_deck()
+    decks = []
+    for x in range(count):
+        rng.shuffle(deck)
+        decks.append(deck[:])
+    return decks
+
+
+def by_deletion(deck):
+    simulator.dealt = list(deck)
+    return simulator.check_by_deletion()
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_resolver_matches_check_by_deletion(seed):
+    resolver = Resolver()
+    for deck in random_decks(seed):
+        assert resolver.play(deck) == by_deletion(deck)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_play_counted_matches_play(seed):
+    resolver = Resolver()
+    stats = new_stats()
+    for deck in random_decks(seed):
+        assert resolver.play_counted(deck, stats) == resolver.play(deck)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_batch_engine_matches_check_by_deletion(seed):
+    batch_engine = pytest.importorskip('batch_engine')
+    decks = random_decks(seed)
+    assert batch_engine.check_batch(decks).tolist() == [by_deletion(deck) for deck in decks]
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_batch_engine_counts_the_same_matches(seed):
+    batch_engine = pytest.importorskip('batch_engine')
+    decks = random_decks(seed)
+    resolver = Resolver()
+    expected = new_stats()
+    for deck in decks:
+        resolver.play_counted(deck, expected)
+    stats = new_stats()
+    batch_engine.check_batch(decks, stats)
+    assert (stats['rank_matches'], stats['suit_matches']) == (expected['rank_matches'], expected['suit_matches'])
+
+
+def test_verify_finds_no_mismatches():
+    assert simulator.verify(500, seed=1) == 0
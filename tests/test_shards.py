@@ -0,0 +1,57 @@
+import pytest
+
+import shards
+from result_store import ResultStore
+
+GAMES_PER_SEED = 200
+
+
+def write_shards(directory, ranges, seed=7):
+    directory.mkdir(exist_ok=True)
+    paths = []
+    for start, stop in ranges:
+        shard = shards.run_shard(seed, start, stop, GAMES_PER_SEED, workers=1, rng='stdlib')
+        path = directory / f"shard-{start}.json"
+        shards.write_shard(shard, str(path))
+        paths.append(str(path))
+    return paths
+
+
+def totals(db):
+    store = ResultStore(db)
+    try:
+        return store.totals()
+    finally:
+        store.close()
+
+
+def test_merging_again_adds_nothing(tmp_path):
+    db = str(tmp_path / 'simulator.db')
+    paths = write_shards(tmp_path, [(0, 2), (2, 3)])
+    assert len(shards.merge(paths, db)) == 2
+    merged = totals(db)
+    assert sum(merged.values()) == 3 * GAMES_PER_SEED
+
+    assert shards.merge(paths, db) == []
+    assert shards.merge(paths[1:], db) == []
+    assert totals(db) == merged
+
+
+def test_shards_add_up_to_one_run(tmp_path):
+    split = write_shards(tmp_path / 'split', [(0, 1), (1, 3)])
+    whole = write_shards(tmp_path / 'whole', [(0, 3)])
+    split_db = str(tmp_path / 'split.db')
+    whole_db = str(tmp_path / 'whole.db')
+    shards.merge(split, split_db)
+    shards.merge(whole, whole_db)
+    assert totals(split_db) == totals(whole_db)
+
+
+def test_overlapping_and_missing_ranges_are_refused(tmp_path):
+    db = str(tmp_path / 'simulator.db')
+    shards.merge(write_shards(tmp_path, [(0, 2)]), db)
+    with pytest.raises(ValueError, match='overlaps'):
+        shards.merge(write_shards(tmp_path, [(1, 3)]), db)
+    with pytest.raises(ValueError, match='missing'):
+        shards.merge(write_shards(tmp_path, [(3, 4)]), db)
+    assert sum(totals(db).values()) == 2 * GAMES_PER_SEED